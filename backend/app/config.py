@@ -0,0 +1,69 @@
+import os
+
+MC_RUNS = int(os.getenv("MC_RUNS", "600"))
+MC_SEED = int(os.getenv("MC_SEED", "2024"))
+
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "512"))
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH")
+EXTRACTION_CACHE_DISK_ENTRIES = int(os.getenv("EXTRACTION_CACHE_DISK_ENTRIES", "50000"))
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_QUEUE_DEPTH = int(os.getenv("PARSE_QUEUE_DEPTH", "32"))
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "30"))
+
+PDF_PAGE_BUDGET = int(os.getenv("PDF_PAGE_BUDGET", "50"))
+
+# Uploads are spooled to UPLOAD_DIR (system temp dir by default) in chunks.
+# UPLOAD_MAX_BYTES caps each PDF; UPLOAD_MAX_REQUEST_BYTES caps a whole
+# request body, batch uploads included, by its Content-Length.
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR")
+
+BATCH_MAX_REPORTS = int(os.getenv("BATCH_MAX_REPORTS", "5000"))
+BATCH_PARSE_CONCURRENCY = int(os.getenv("BATCH_PARSE_CONCURRENCY", str(PARSE_WORKERS * 2)))
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+NARRATIVE_WORKERS = int(os.getenv("NARRATIVE_WORKERS", "4"))
+NARRATIVE_JOB_RETENTION = int(os.getenv("NARRATIVE_JOB_RETENTION", "10000"))
+NARRATIVE_QUEUE_DEPTH = int(os.getenv("NARRATIVE_QUEUE_DEPTH", "256"))
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "state.db")
+STATE_TTL_SECONDS = float(os.getenv("STATE_TTL_SECONDS", "86400"))
+STATE_MAX_SESSIONS = int(os.getenv("STATE_MAX_SESSIONS", "10000"))
+STATE_MAX_BYTES = int(os.getenv("STATE_MAX_BYTES", str(64 * 1024 * 1024)))
+STATE_HISTORY_SIZE = int(os.getenv("STATE_HISTORY_SIZE", "256"))
+STATE_PRUNE_SECONDS = float(os.getenv("STATE_PRUNE_SECONDS", "60"))
+
+TREND_EWMA_ALPHA = float(os.getenv("TREND_EWMA_ALPHA", "0.3"))
+TREND_SLOPE_THRESHOLD = float(os.getenv("TREND_SLOPE_THRESHOLD", "2.0"))
+TREND_MAX_PATIENTS = int(os.getenv("TREND_MAX_PATIENTS", "10000"))
+
+COHORT_DATA_DIR = os.getenv("COHORT_DATA_DIR", "cohort_data")
+
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "250000"))
+
+# Rows scored per vectorized call (and per streamed output chunk) on /score/columnar.
+COLUMNAR_CHUNK_ROWS = int(os.getenv("COLUMNAR_CHUNK_ROWS", "65536"))
+
+SEARCH_TIME_BUDGET_MS = float(os.getenv("SEARCH_TIME_BUDGET_MS", "250"))
+SEARCH_BEAM_WIDTH = int(os.getenv("SEARCH_BEAM_WIDTH", "64"))
+SEARCH_MAX_EVALUATIONS = int(os.getenv("SEARCH_MAX_EVALUATIONS", "50000"))
+
+POPULATION_MEMORY_BUDGET_MB = int(os.getenv("POPULATION_MEMORY_BUDGET_MB", "512"))
+POPULATION_WORKERS = int(os.getenv("POPULATION_WORKERS", "0"))
+
+RISK_MODEL_DIR = os.getenv(
+    "RISK_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "risk_models")
+)
+
+# Comma-separated components to load at startup instead of on first use:
+# "parsers" (PDF libraries in every parse worker), "llm" (pooled client), or "all".
+WARMUP = [c.strip() for c in os.getenv("WARMUP", "").split(",") if c.strip()]
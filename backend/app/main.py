@@ -1,45 +1,56 @@
 from fastapi import FastAPI, UploadFile, File, Query, HTTPException
-import pdfplumber
-import re
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import numpy as np
-import random
 import math
+from functools import lru_cache
+from app.config import MC_RUNS, MC_SEED, SWEEP_MAX_POINTS
+from app.models.schemas import SweepRequest, SweepRange
+from app.services.extraction_cache import extraction_cache
+from app.services.parse_executor import parse_executor, parse_cached
+from app.services.marker_table import MarkerTable
+from app.services.pdf_parser import extract_markers
+from app.services.state_store import state_store
+from app.services.risk_engine import round_batch
+from app.services.risk_model import get_model
+from app.services.metrics import instrument_request, render_metrics, stage, current_notes
+from app.services.warmup import warm_up
+from app.services.uploads import spool_upload, limit_upload_body
+from app.routes.cohort_routes import router as cohort_router
+from app.routes.report_routes import router as report_router
+from app.routes.risk_routes import router as risk_model_router
 
 app = FastAPI(title="Hybrid Preventive Intelligence System 2.0.0")
 
-BASELINE = {}
-HISTORY = []
-
-def f(x):
-    try:
-        return float(x)
-    except:
-        return None
-
-def extract(label, text):
-    pattern = rf"{label}[^\n]*?\n?.*?([\d]+\.?[\d]*)"
-    m = re.search(pattern, text, re.IGNORECASE)
-    return f(m.group(1)) if m else None
-
-def parse_pdf(file):
-    text = ""
-    with pdfplumber.open(file.file) as pdf:
-        for p in pdf.pages:
-            t = p.extract_text()
-            if t:
-                text += t + "\n"
-    return {
-        "fasting_glucose": extract("Glucose, Fasting", text),
-        "hba1c": extract("HbA1c", text),
-        "ldl": extract("LDL Cholesterol", text),
-        "hdl": extract("HDL Cholesterol", text),
-        "triglycerides": extract("Triglycerides", text),
-        "ast": extract("AST \\(SGOT\\)", text),
-        "alt": extract("ALT \\(SGPT\\)", text),
-        "hs_crp": extract("High Sensitivity CRP", text),
-        "vitamin_d": extract("Vitamin D, 25 Hydroxy", text),
-        "esr": extract("E\\.S\\.R\\.", text),
-    }
+app.middleware("http")(limit_upload_body)
+app.middleware("http")(instrument_request)
+app.include_router(cohort_router)
+app.include_router(report_router)
+app.include_router(risk_model_router)
+
+REPORT_MARKERS = MarkerTable({
+    "fasting_glucose": r"Glucose, Fasting",
+    "hba1c": r"HbA1c",
+    "ldl": r"LDL Cholesterol",
+    "hdl": r"HDL Cholesterol",
+    "triglycerides": r"Triglycerides",
+    "ast": r"AST \(SGOT\)",
+    "alt": r"ALT \(SGPT\)",
+    "hs_crp": r"High Sensitivity CRP",
+    "vitamin_d": r"Vitamin D, 25 Hydroxy",
+    "esr": r"E\.S\.R\.",
+}, lines_ahead=1)
+
+PARSER_VERSION = "4"
+
+async def parse_pdf(file):
+    with stage("upload_read"):
+        upload=await spool_upload(file)
+    with upload:
+        return await parse_cached(upload, "main", PARSER_VERSION, parse_pdf_bytes)
+
+def parse_pdf_bytes(data):
+    return extract_markers(data, REPORT_MARKERS)
 
 def norm(v, low, high):
     if v is None:
@@ -50,69 +61,57 @@ def norm(v, low, high):
         return 1
     return (v - low) / (high - low)
 
-def liver(ast, alt):
-    vals=[]
-    if ast is not None: vals.append(norm(ast,40,200))
-    if alt is not None: vals.append(norm(alt,40,300))
-    return min(1,np.mean(vals)) if vals else None
-
-def cardio(ldl,tg,hs):
-    vals=[]
-    if ldl is not None: vals.append(norm(ldl,100,190))
-    if tg is not None: vals.append(norm(tg,150,300))
-    if hs is not None: vals.append(norm(hs,1,10))
-    return min(1,np.mean(vals)) if vals else None
-
-def metabolic(a1c,glucose):
-    vals=[]
-    if a1c is not None: vals.append(norm(a1c,5.6,7))
-    if glucose is not None: vals.append(norm(glucose,100,160))
-    return min(1,np.mean(vals)) if vals else None
-
-def inflammatory(hs,esr):
-    vals=[]
-    if hs is not None: vals.append(norm(hs,1,10))
-    if esr is not None: vals.append(norm(esr,15,60))
-    return min(1,np.mean(vals)) if vals else None
-
-def nutritional(vd):
-    if vd is None: return None
-    return 0 if vd>=75 else min(1,(75-vd)/75)
-
-def resilience(stress,sleep):
+def domain_index(spec,b,stress=None,sleep=None):
+    if "inputs" in spec:
+        vals=[norm(b[k],low,high) for k,(low,high) in spec["inputs"].items() if b.get(k) is not None]
+        return min(1,np.mean(vals)) if vals else None
+    if "deficiency" in spec:
+        (k,pivot),=spec["deficiency"].items()
+        v=b.get(k)
+        if v is None: return None
+        return 0 if v>=pivot else min(1,(pivot-v)/pivot)
     if stress is None or sleep is None: return None
-    stress_factor=norm(stress,2,10)
-    sleep_factor=1-norm(sleep,6,9)
+    stress_factor=norm(stress,*spec["resilience"]["stress"])
+    sleep_factor=1-norm(sleep,*spec["resilience"]["sleep"])
     return min(1,(stress_factor+sleep_factor)/2)
 
-def compliance(resilience_index):
-    if resilience_index is None: return 0.5
-    return round(1 - resilience_index*0.6,2)
+def compliance(resilience_index,model):
+    if resilience_index is None: return model.compliance["default"]
+    return round(1 - resilience_index*model.compliance["resilience_weight"],2)
 
-def override(b):
-    if b.get("alt") and b["alt"]>200: return True
-    if b.get("hs_crp") and b["hs_crp"]>3: return True
-    if b.get("hba1c") and b["hba1c"]>=5.7: return True
+def override(b,model):
+    for k,above,at_least in model.override_rules:
+        if not b.get(k): continue
+        if above is not None and b[k]>above: return True
+        if at_least is not None and b[k]>=at_least: return True
     return False
 
-def volatility_multiplier(indices):
-    high_domains=sum(1 for v in indices.values() if v and v>0.6)
-    return 0.1 + high_domains*0.05
-
-def monte_carlo(score,vol,runs=600):
-    sims=[]
-    for _ in range(runs):
-        sims.append(score*(1+random.uniform(-vol,vol)))
-    return {
-        "mean":round(np.mean(sims),1),
-        "low":round(np.percentile(sims,10),1),
-        "high":round(np.percentile(sims,90),1)
-    }
-
-def economic_impact(score):
-    annual_cost=score*120
-    ten_year=annual_cost*10
-    preventable_portion=ten_year*0.35
+def volatility_multiplier(indices,model):
+    high_domains=sum(1 for v in indices.values() if v and v>model.volatility["high_domain_above"])
+    return model.volatility["base"] + high_domains*model.volatility["per_high_domain"]
+
+def mc_seed(scores,vols,seed=None):
+    base=MC_SEED if seed is None else seed
+    return [base]+[int(round(x*1e6)) for x in np.concatenate([scores.ravel(),vols.ravel()])]
+
+def monte_carlo(scores,vols,runs=MC_RUNS,seed=None):
+    # One draw of shape (envelopes, runs); the generator is seeded from the
+    # inputs so identical scores and volatilities always give identical bands.
+    scores=np.asarray(scores,dtype=float).reshape(-1,1)
+    vols=np.asarray(vols,dtype=float).reshape(-1,1)
+    rng=np.random.default_rng(mc_seed(scores,vols,seed))
+    sims=scores*(1+rng.uniform(-vols,vols,size=(len(scores),runs)))
+    mean=sims.mean(axis=1)
+    low,high=np.percentile(sims,[10,90],axis=1)
+    return [
+        {"mean":round(mean[k],1),"low":round(low[k],1),"high":round(high[k],1)}
+        for k in range(len(scores))
+    ]
+
+def economic_impact(score,model):
+    annual_cost=score*model.economics["annual_cost_per_point"]
+    ten_year=annual_cost*model.economics["years"]
+    preventable_portion=ten_year*model.economics["preventable_share"]
     return {
         "estimated_annual_risk_cost_usd":round(annual_cost,0),
         "ten_year_projected_cost_usd":round(ten_year,0),
@@ -127,53 +126,187 @@ def intervention_roi(base,new):
         "impact_magnitude":"High" if abs(delta)>20 else "Moderate" if abs(delta)>10 else "Low"
     }
 
-def compute(b,stress=None,sleep=None):
-    l=liver(b.get("ast"),b.get("alt"))
-    c=cardio(b.get("ldl"),b.get("triglycerides"),b.get("hs_crp"))
-    m=metabolic(b.get("hba1c"),b.get("fasting_glucose"))
-    i=inflammatory(b.get("hs_crp"),b.get("esr"))
-    n=nutritional(b.get("vitamin_d"))
-    r=resilience(stress,sleep)
-
-    indices={
-        "liver_index":l,
-        "cardio_index":c,
-        "metabolic_index":m,
-        "inflammatory_index":i,
-        "nutritional_index":n,
-        "resilience_index":r
+def preventive_model(version=None):
+    try:
+        return get_model(version,engine="preventive")
+    except ValueError as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+@lru_cache(maxsize=4096)
+def _envelope(score,vol,k,kv,seed):
+    return monte_carlo([score,score*k],[vol,vol*kv],seed=seed)
+
+def envelope(score,vol,model,seed=None):
+    # Bands are a pure function of (score, vol, seed), so what-if moves that
+    # leave both unchanged reuse the simulated envelope.
+    k=model.projections["10_year_score_multiplier"]
+    kv=model.projections["10_year_volatility_multiplier"]
+    return [dict(band) for band in _envelope(score,vol,k,kv,seed)]
+
+def domain_nodes(b,stress,sleep,model,previous=None,changed=None):
+    # With the baseline's indices, only domains that read a changed input are
+    # re-evaluated. Averaged domains are NumPy scalars on the full path, which
+    # a JSON-backed state store turns into floats; they are restored so the
+    # rounding of the vector is unchanged.
+    if previous is None:
+        return {k:domain_index(spec,b,stress,sleep) for k,spec in model.domains.items()}
+    return {
+        k:domain_index(spec,b,stress,sleep) if model.domain_inputs[k]&changed
+        else np.float64(previous[k]) if "inputs" in spec and isinstance(previous[k],float)
+        else previous[k]
+        for k,spec in model.domains.items()
     }
 
+def compute(b,stress=None,sleep=None,seed=None,model=None,indices=None):
+    model=model or get_model(engine="preventive")
+    if indices is None: indices=domain_nodes(b,stress,sleep,model)
+
     valid=[v for v in indices.values() if v is not None]
     if not valid: raise HTTPException(status_code=400,detail="Insufficient data")
 
-    weighted=(0.25*(l or 0)+0.25*(c or 0)+0.2*(m or 0)+0.2*(i or 0)+0.05*(n or 0)+0.05*(r or 0))
+    weighted=sum(spec["weight"]*(indices[k] or 0) for k,spec in model.domains.items())
     score=int(weighted*100)
 
-    if override(b): score=max(score,60)
+    if override(b,model): score=max(score,model.override_floor)
 
-    if score<30: level="Low Risk"
-    elif score<60: level="Moderate Risk"
-    else: level="High Risk"
+    level=model.level(score)
 
-    vol=volatility_multiplier(indices)
-    p5=monte_carlo(score,vol)
-    p10=monte_carlo(score*1.15,vol*1.4)
+    vol=volatility_multiplier(indices,model)
+    p5,p10=envelope(score,vol,model,seed)
 
-    compliance_prob=compliance(r)
-    econ=economic_impact(score)
+    compliance_prob=compliance(indices.get("resilience_index"),model)
+    econ=economic_impact(score,model)
 
     return score,level,{k:round(v or 0,2) for k,v in indices.items()},vol,p5,p10,compliance_prob,econ
 
+SIMULATABLE = ["ldl","triglycerides","alt","hs_crp","vitamin_d","stress_level","sleep_hours"]
+MAGNITUDES = np.array(["Low","Moderate","High"])
+
+def norm_batch(v,low,high):
+    return np.clip((v-low)/(high-low),0,1)
+
+def mean_present(*vals):
+    total=np.zeros(len(vals[0]))
+    count=np.zeros(len(vals[0]))
+    for v in vals:
+        present=~np.isnan(v)
+        total=total+np.where(present,v,0.0)
+        count=count+present
+    with np.errstate(invalid="ignore",divide="ignore"):
+        return np.where(count>0,np.minimum(1,total/count),np.nan)
+
+def domain_index_batch(spec,g,stress,sleep):
+    if "inputs" in spec:
+        return mean_present(*(norm_batch(g(k),low,high) for k,(low,high) in spec["inputs"].items()))
+    if "deficiency" in spec:
+        (k,pivot),=spec["deficiency"].items()
+        v=g(k)
+        return np.where(v>=pivot,0,np.minimum(1,(pivot-v)/pivot))
+    return np.minimum(1,(norm_batch(stress,*spec["resilience"]["stress"])+(1-norm_batch(sleep,*spec["resilience"]["sleep"])))/2)
+
+def compute_batch(cols,stress,sleep,seed=None,model=None):
+    # Column-wise twin of compute(): NaN stands in for None, and every output
+    # agrees with the scalar path point for point.
+    model=model or get_model(engine="preventive")
+    g=lambda k:np.asarray(cols[k],dtype=float) if k in cols else np.full(len(stress),np.nan)
+    indices={k:domain_index_batch(spec,g,stress,sleep) for k,spec in model.domains.items()}
+    z=lambda v:np.nan_to_num(v,nan=0.0)
+
+    weighted=sum(spec["weight"]*z(indices[k]) for k,spec in model.domains.items())
+    score=(weighted*100).astype(int)
+    forced=np.zeros(len(score),dtype=bool)
+    for k,above,at_least in model.override_rules:
+        if above is not None: forced|=g(k)>above
+        if at_least is not None: forced|=g(k)>=at_least
+    score=np.where(forced,np.maximum(score,model.override_floor),score)
+    bounds=[below for below,_ in model.level_rules if below is not None]
+    level=np.array([label for _,label in model.level_rules])[np.digitize(score,bounds)]
+
+    high=sum((v>model.volatility["high_domain_above"]).astype(int) for v in indices.values())
+    vol=model.volatility["base"]+high*model.volatility["per_high_domain"]
+
+    # Bands depend only on (score, vol), so each distinct pair is simulated once.
+    pairs,inverse=np.unique(np.stack([score,vol],axis=1),axis=0,return_inverse=True)
+    bands=[envelope(sc,v,model,seed) for sc,v in pairs]
+    projection={
+        horizon:{
+            stat:np.array([b[k][stat] for b in bands])[inverse.ravel()]
+            for stat in ("mean","low","high")
+        }
+        for k,horizon in enumerate(("5_year","10_year"))
+    }
+
+    r=indices.get("resilience_index",np.full(len(score),np.nan))
+    compliance_prob=np.where(np.isnan(r),model.compliance["default"],round_batch(1-z(r)*model.compliance["resilience_weight"],2))
+
+    return {
+        "risk_score":score,
+        "risk_level":level,
+        # Averaged domains are NumPy scalars on the scalar path (np.round),
+        # the others are Python floats (round()).
+        "risk_vector":{
+            k:(np.round(z(v),2) if "inputs" in model.domains[k] else round_batch(z(v),2))
+            for k,v in indices.items()
+        },
+        "volatility_index":vol,
+        "event_probability_projection":projection,
+        "compliance_probability":compliance_prob,
+        "valid":~np.all(np.isnan(np.stack(list(indices.values()))),axis=0)
+    }
+
+def sweep_count(axis):
+    # Counted before anything is allocated, so an oversized range is a 400.
+    if isinstance(axis,SweepRange):
+        if not all(map(math.isfinite,(axis.start,axis.stop,axis.step))):
+            raise HTTPException(status_code=400,detail="Sweep range must be finite")
+        if axis.step<=0: raise HTTPException(status_code=400,detail="Sweep step must be positive")
+        return max(math.floor((axis.stop-axis.start)/axis.step+1e-9)+1,0)
+    return len(axis)
+
+def sweep_values(axis,count):
+    if isinstance(axis,SweepRange):
+        return axis.start+np.arange(count)*axis.step
+    return np.asarray(axis,dtype=float)
+
+async def state_call(method,*args):
+    # The SQLite backend can wait up to its busy timeout on another worker's
+    # write lock, so its calls run in the threadpool, not on the event loop.
+    return await run_in_threadpool(method,*args) if state_store.blocking else method(*args)
+
+async def set_baseline(session_id,biomarkers,score,level,vector,vol,p5,p10,indices=None,model=None):
+    # Scored once per upload; simulations only read the cached result. The raw
+    # domain indices are kept so scenarios re-evaluate only what they change.
+    await state_call(state_store.set_baseline,session_id,biomarkers,{
+        "risk_score":score,
+        "risk_level":level,
+        "risk_vector":vector,
+        "volatility_index":vol,
+        "event_probability_projection":{"5_year":p5,"10_year":p10},
+        "domain_indices":indices,
+        "model_version":model.version if model else None
+    })
+
+def attribution(indices,model):
+    return {k:round(spec["weight"]*(indices[k] or 0)*100,2) for k,spec in model.domains.items()}
+
 @app.post("/upload-report")
-async def upload_report(file:UploadFile=File(...)):
-    biomarkers=parse_pdf(file)
-    score,level,vector,vol,p5,p10,comp,econ=compute(biomarkers)
-    BASELINE.clear()
-    BASELINE.update(biomarkers)
-    HISTORY.append(score)
+async def upload_report(
+    file:UploadFile=File(...),
+    seed:int|None=Query(None,ge=0),
+    session_id:str=Query("default"),
+    model_version:str|None=Query(None),
+):
+    model=preventive_model(model_version)
+    biomarkers=await parse_pdf(file)
+    with stage("risk_engine"):
+        indices=domain_nodes(biomarkers,None,None,model)
+        score,level,vector,vol,p5,p10,comp,econ=compute(biomarkers,seed=seed,model=model,indices=indices)
+    await set_baseline(session_id,biomarkers,score,level,vector,vol,p5,p10,indices,model)
+    await state_call(state_store.append_history,session_id,score)
     return {
+        "model_version":model.version,
         "biomarkers":biomarkers,
+        "extraction_backend":current_notes().get("pdf_backend"),
         "risk_score":score,
         "risk_level":level,
         "risk_vector":vector,
@@ -193,27 +326,41 @@ async def simulate_risk(
     vitamin_d:float|None=Query(None),
     stress_level:int|None=Query(None),
     sleep_hours:float|None=Query(None),
+    seed:int|None=Query(None,ge=0),
+    session_id:str=Query("default"),
+    model_version:str|None=Query(None),
 ):
-    if not BASELINE:
+    model=preventive_model(model_version)
+    baseline,base=await state_call(state_store.get_baseline,session_id)
+    if not baseline:
         raise HTTPException(status_code=400,detail="Upload baseline first")
 
-    scenario=BASELINE.copy()
+    scenario=baseline.copy()
     if ldl is not None: scenario["ldl"]=ldl
     if triglycerides is not None: scenario["triglycerides"]=triglycerides
     if alt is not None: scenario["alt"]=alt
     if hs_crp is not None: scenario["hs_crp"]=hs_crp
     if vitamin_d is not None: scenario["vitamin_d"]=vitamin_d
 
-    new_score,new_level,new_vector,vol,p5,p10,comp,econ=compute(scenario,stress_level,sleep_hours)
-    base_score,_,_,_,_,_,_,_=compute(BASELINE)
+    changed={k for k,v in scenario.items() if v!=baseline.get(k)}
+    changed|={k for k,v in (("stress_level",stress_level),("sleep_hours",sleep_hours)) if v is not None}
+    previous=base.get("domain_indices") if base.get("model_version")==model.version else None
+
+    with stage("risk_engine"):
+        indices=domain_nodes(scenario,stress_level,sleep_hours,model,previous,changed)
+        new_score,new_level,new_vector,vol,p5,p10,comp,econ=compute(scenario,stress_level,sleep_hours,seed,model,indices)
+    base_score=base["risk_score"]
 
     roi=intervention_roi(base_score,new_score)
-    HISTORY.append(new_score)
+    await state_call(state_store.append_history,session_id,new_score)
 
     trajectory="Improving" if new_score<base_score else "Worsening" if new_score>base_score else "Stable"
 
     return {
+        "model_version":model.version,
         "baseline_risk_score":base_score,
+        "baseline_risk_vector":base["risk_vector"],
+        "baseline_event_probability_projection":base["event_probability_projection"],
         "simulated_risk_score":new_score,
         "risk_delta":roi,
         "risk_level":new_level,
@@ -223,5 +370,88 @@ async def simulate_risk(
         "event_probability_projection":{"5_year":p5,"10_year":p10},
         "compliance_probability":comp,
         "economic_impact_model":econ,
+        "recomputed_domains":[k for k in model.domains if previous is None or model.domain_inputs[k]&changed],
+        "risk_attribution":{
+            "scenario":attribution(indices,model),
+            "baseline":attribution(previous,model) if previous else None
+        },
         "executive_summary":f"Scenario shifts risk from {base_score} to {new_score}. Direction: {trajectory}. Intervention classified as {roi['impact_magnitude']} impact."
-    }
\ No newline at end of file
+    }
+
+@app.post("/simulate-risk/sweep")
+async def simulate_risk_sweep(request:SweepRequest):
+    model=preventive_model(request.model_version)
+    baseline,base=await state_call(state_store.get_baseline,request.session_id)
+    if not baseline:
+        raise HTTPException(status_code=400,detail="Upload baseline first")
+
+    unknown=set(request.axes)-set(SIMULATABLE)
+    if unknown:
+        raise HTTPException(status_code=400,detail=f"Cannot sweep: {', '.join(sorted(unknown))}")
+
+    names=list(request.axes)
+    shape=[sweep_count(request.axes[k]) for k in names]
+    points=math.prod(shape) if shape else 0
+    if points==0 or points>SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400,detail=f"Sweep must have between 1 and {SWEEP_MAX_POINTS} points")
+    values=[sweep_values(request.axes[k],n) for k,n in zip(names,shape)]
+
+    grid=dict(zip(names,(v.ravel() for v in np.meshgrid(*values,indexing="ij"))))
+    cols={k:np.full(points,np.nan if v is None else v,dtype=float) for k,v in baseline.items()}
+    cols.update({k:v for k,v in grid.items() if k not in ("stress_level","sleep_hours")})
+    fixed=lambda k,v:grid[k] if k in grid else np.full(points,np.nan if v is None else v,dtype=float)
+    stress=fixed("stress_level",request.stress_level)
+    sleep=fixed("sleep_hours",request.sleep_hours)
+
+    with stage("risk_engine_batch"):
+        result=compute_batch(cols,stress,sleep,request.seed,model)
+    base_score=base["risk_score"]
+    delta=result["risk_score"]-base_score
+    relative=round_batch(delta/base_score*100,2) if base_score else np.zeros(points)
+    magnitude=MAGNITUDES[np.digitize(np.abs(delta),[10,20],right=True)]
+    dense=lambda a:np.asarray(a).reshape(shape).tolist()
+
+    return {
+        "model_version":model.version,
+        "axes":{k:v.tolist() for k,v in zip(names,values)},
+        "shape":shape,
+        "baseline_risk_score":base_score,
+        "simulated_risk_score":dense(result["risk_score"]),
+        "risk_level":dense(result["risk_level"]),
+        "risk_delta":{
+            "delta":dense(delta),
+            "absolute_risk_reduction":dense(np.maximum(-delta,0)),
+            "relative_percent_change":dense(relative),
+            "impact_magnitude":dense(magnitude)
+        },
+        "volatility_index":dense(round_batch(result["volatility_index"],2)),
+        "event_probability_projection":{
+            horizon:{stat:dense(v) for stat,v in bands.items()}
+            for horizon,bands in result["event_probability_projection"].items()
+        },
+        "compliance_probability":dense(result["compliance_probability"])
+    }
+
+@app.get("/history")
+async def history(session_id:str=Query("default")):
+    return {"session_id":session_id,"risk_scores":await state_call(state_store.history,session_id)}
+
+@app.get("/parser-metrics")
+async def parser_metrics():
+    return {
+        "executor":parse_executor.stats(),
+        "extraction_cache":extraction_cache.stats()
+    }
+
+@app.get("/metrics",response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(),media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def warm_up_components():
+    # No-op unless WARMUP is set; otherwise parsers and the LLM client load on first use.
+    await warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_parser():
+    parse_executor.shutdown()
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field, confloat
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float
+    step: float
+
+
+class SweepRequest(BaseModel):
+    axes: Dict[str, Union[SweepRange, List[float]]]
+    stress_level: Optional[int] = None
+    sleep_hours: Optional[float] = None
+    session_id: str = "default"
+    seed: Optional[int] = Field(None, ge=0)
+    model_version: Optional[str] = None
+
+
+class InterventionSearchRequest(BaseModel):
+    biomarkers: Dict[str, Optional[float]]
+    behavioral: Dict[str, Optional[float]] = {}
+    target_level: str = "Low Risk"
+    target_score: Optional[int] = None
+    min_compliance: float = Field(0.3, ge=0, le=1)
+    # A zero or negative cost would let the search repeat a lever for free.
+    costs: Dict[str, confloat(gt=0)] = {}
+    time_budget_ms: Optional[float] = None
+    model_version: Optional[str] = None
+
+
+class PopulationSimulationRequest(BaseModel):
+    patients: List[Dict[str, Optional[float]]]
+    paths: int = 1000
+    horizons: List[int] = [5, 10]
+    drift: Optional[List[float]] = None
+    covariance: Optional[List[List[float]]] = None
+    seed: Optional[int] = Field(None, ge=0)
+
+
+class ScoreRequest(BaseModel):
+    biomarkers: Dict[str, Optional[float]]
+    demographics: Dict[str, Any] = {}
+    behavioral: Dict[str, Optional[float]] = {}
+    model_version: Optional[str] = None
+    explain: bool = False
+
+
+class ScoreBatchRequest(BaseModel):
+    rows: List[ScoreRequest]
+    model_version: Optional[str] = None
+    explain: bool = False
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.services.cohort_store import cohort_store
+
+router = APIRouter(prefix="/cohort")
+
+GROUP_BY = (None, "employer", "age_band", "gender")
+
+
+def _check_group(group_by):
+    if group_by not in GROUP_BY:
+        raise HTTPException(
+            status_code=400,
+            detail="group_by must be one of employer, age_band, gender"
+        )
+
+
+@router.get("/distribution")
+async def cohort_distribution(
+    group_by: Optional[str] = None,
+    employer_id: Optional[str] = None
+):
+    _check_group(group_by)
+    return cohort_store.distribution(group_by, employer_id)
+
+
+@router.get("/percentiles")
+async def cohort_percentiles(
+    group_by: Optional[str] = None,
+    employer_id: Optional[str] = None
+):
+    _check_group(group_by)
+    return cohort_store.percentiles(group_by, employer_id)
+
+
+@router.get("/risk-levels")
+async def cohort_risk_levels(
+    group_by: Optional[str] = None,
+    employer_id: Optional[str] = None
+):
+    _check_group(group_by)
+    return cohort_store.risk_level_mix(group_by, employer_id)
+
+
+@router.get("/domain-priorities")
+async def cohort_domain_priorities(
+    group_by: Optional[str] = None,
+    employer_id: Optional[str] = None
+):
+    _check_group(group_by)
+    return cohort_store.domain_priorities(group_by, employer_id)
@@ -1,12 +1,45 @@
+import asyncio
+import json
+import zipfile
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Optional
-from app.services.biomarker_extractor import extract_biomarkers_from_pdf
-from app.services.risk_engine import calculate_risk_engine
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from app.config import BATCH_MAX_REPORTS, BATCH_PARSE_CONCURRENCY, SEARCH_TIME_BUDGET_MS, UPLOAD_MAX_BYTES
+from app.models.schemas import InterventionSearchRequest, PopulationSimulationRequest
+from app.services.biomarker_extractor import extract_biomarkers_from_pdf, EXTRACTOR_VERSION
+from app.services.parse_executor import parse_cached
+from app.services.uploads import spool_pdf, spool_upload, inspect_pdf
+from app.services.risk_engine import (
+    calculate_risk_engine,
+    calculate_risk_engine_batch,
+    batch_result_rows,
+    BATCH_BIOMARKERS
+)
+from app.services.risk_model import get_model
+from app.services.metrics import stage, start_trace, stop_trace, current_notes
+from app.services.score_graph import RiskGraph, risk_graphs
 from app.services.clinical_summary import generate_clinical_summary
 from app.services.intervention_engine import generate_intervention_plan
-from app.services.ai_report_engine import generate_ai_clinical_report
+from app.services.ai_report_engine import generate_ai_clinical_report_async
+from app.services.narrative_jobs import narrative_jobs
+from app.services.cohort_store import cohort_store
+from app.services.intervention_search import (
+    find_optimal_intervention,
+    DEFAULT_LEVERS,
+    target_scores
+)
+from app.services.population_simulator import simulate_population
+from app.services.timeseries_store import timeseries_store, trend_trajectory
 
-router = APIRouter()
+router = APIRouter(prefix="/report")
+
+
+def _risk_model(version):
+    try:
+        return get_model(version)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.post("/upload-report")
@@ -20,15 +53,29 @@ async def upload_report(
     sleep_hours: Optional[float] = None,
     stress_level: Optional[int] = None,
     exercise_days: Optional[int] = None,
-    alcohol_frequency: Optional[int] = None
+    alcohol_frequency: Optional[int] = None,
+    defer_narrative: bool = False,
+    patient_id: Optional[str] = None,
+    measured_at: Optional[float] = None,
+    employer_id: Optional[str] = None,
+    model_version: Optional[str] = None
 ):
 
+    model = _risk_model(model_version)
+
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF supported")
 
-    file_bytes = await file.read()
+    with stage("upload_read"):
+        upload = await spool_upload(file)
 
-    biomarkers = extract_biomarkers_from_pdf(file_bytes)
+    with upload:
+        biomarkers = await parse_cached(
+            upload,
+            "biomarker_extractor",
+            EXTRACTOR_VERSION,
+            extract_biomarkers_from_pdf
+        )
 
     demographics = {
         "age": age,
@@ -45,19 +92,49 @@ async def upload_report(
         "alcohol_frequency": alcohol_frequency
     }
 
-    risk_result = calculate_risk_engine(biomarkers, demographics, behavioral)
+    with stage("risk_engine"):
+        graph = RiskGraph(biomarkers, behavioral, model)
+        risk_result = dict(graph.result())
 
-    intervention_plan = generate_intervention_plan(
-        biomarkers,
-        risk_result["risk_vector"]
-    )
+    if patient_id:
+        # Kept as the what-if baseline for /simulate-risk?patient_id=...
+        risk_graphs.put(patient_id, graph)
+        trend = timeseries_store.append(patient_id, biomarkers, risk_result, measured_at)
+        risk_result["risk_trajectory"] = trend_trajectory(trend, risk_result["risk_trajectory"])
+        risk_result["risk_trend"] = trend
 
-    clinical_summary = generate_clinical_summary(biomarkers)
+    # File appends under a cross-process lock; kept off the event loop.
+    await run_in_threadpool(cohort_store.append, [risk_result], [employer_id], [gender], [age])
 
-    ai_report = generate_ai_clinical_report(
-        biomarkers,
-        risk_result
-    )
+    with stage("intervention_plan"):
+        intervention_plan = generate_intervention_plan(
+            biomarkers,
+            risk_result["risk_vector"],
+            model
+        )
+
+    with stage("clinical_summary"):
+        clinical_summary = generate_clinical_summary(biomarkers, model)
+
+    # When the narrative queue is full the report is generated inline instead.
+    job_id = narrative_jobs.submit(biomarkers, risk_result) if defer_narrative else None
+    if job_id is not None:
+        narrative = {
+            "ai_clinical_report": None,
+            "ai_report_job": {
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"{router.prefix}/report-jobs/{job_id}",
+                "events_url": f"{router.prefix}/report-jobs/{job_id}/events"
+            }
+        }
+    else:
+        narrative = {
+            "ai_clinical_report": await generate_ai_clinical_report_async(
+                biomarkers,
+                risk_result
+            )
+        }
 
     return {
         "filename": file.filename,
@@ -65,11 +142,209 @@ async def upload_report(
         **risk_result,
         "intervention_plan": intervention_plan,
         "clinical_summary": clinical_summary,
-        "ai_clinical_report": ai_report,
+        **narrative,
+        "extraction_backend": current_notes().get("pdf_backend"),
         "extraction_confidence": 0.9
     }
 
 
+@router.get("/patients/{patient_id}/history")
+async def patient_history(
+    patient_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    limit: Optional[int] = None
+):
+
+    history = timeseries_store.history(patient_id, start, end, limit)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Unknown patient")
+
+    return {
+        "patient_id": patient_id,
+        "trend": timeseries_store.trend(patient_id),
+        **history
+    }
+
+
+@router.get("/report-jobs/{job_id}")
+async def report_job(job_id: str):
+
+    job = narrative_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+
+    return job
+
+
+@router.get("/report-jobs/{job_id}/events")
+async def report_job_events(job_id: str):
+
+    if narrative_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+
+    async def stream():
+        yield f"event: status\ndata: {json.dumps(narrative_jobs.get(job_id))}\n\n"
+        while True:
+            job = await narrative_jobs.wait(job_id, timeout=15)
+            if job is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            if job["status"] in ("completed", "failed"):
+                yield f"event: report\ndata: {json.dumps(job)}\n\n"
+                return
+            yield ": keep-alive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def _batch_sources(files):
+
+    sources = []
+
+    for upload in files:
+        name = upload.filename or ""
+
+        if name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Not a valid zip archive: {name}")
+            for member in archive.infolist():
+                if member.filename.lower().endswith(".pdf"):
+                    sources.append((member.filename, member.file_size, lambda a=archive, m=member: _spool_member(a, m)))
+
+        elif name.lower().endswith(".pdf"):
+            sources.append((name, upload.size, lambda u=upload: inspect_pdf(u.file)))
+
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported file: {name}")
+
+    if len(sources) > BATCH_MAX_REPORTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {BATCH_MAX_REPORTS} reports"
+        )
+
+    return sources
+
+
+def _spool_member(archive, member):
+    # Zip members are decompressed once into a temp file; PDF parts are
+    # used where Starlette spooled them.
+    with archive.open(member) as stream:
+        return spool_pdf(stream)
+
+
+@router.post("/upload-reports")
+async def upload_reports(
+    files: List[UploadFile] = File(...),
+    sleep_hours: Optional[float] = None,
+    stress_level: Optional[int] = None,
+    exercise_days: Optional[int] = None,
+    alcohol_frequency: Optional[int] = None,
+    employer_id: Optional[str] = None,
+    model_version: Optional[str] = None
+):
+
+    model = _risk_model(model_version)
+    sources = _batch_sources(files)
+    limiter = asyncio.Semaphore(BATCH_PARSE_CONCURRENCY)
+
+    behavioral = {
+        "sleep_hours": sleep_hours,
+        "stress_level": stress_level,
+        "exercise_days": exercise_days,
+        "alcohol_frequency": alcohol_frequency
+    }
+
+    async def parse_one(index, name, size, prepare):
+        # Each report gets its own trace so its PDF backend is not mixed up
+        # with the others parsed concurrently.
+        token = start_trace()
+        try:
+            return await _parse_one(index, name, size, prepare)
+        finally:
+            stop_trace(token)
+
+    async def _parse_one(index, name, size, prepare):
+        async with limiter:
+            try:
+                # Declared sizes (zip headers, multipart parts) are checked
+                # before anything is decompressed or copied.
+                if size is not None and size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"PDF exceeds {UPLOAD_MAX_BYTES} bytes")
+                upload = await run_in_threadpool(prepare)
+                with upload:
+                    biomarkers = await parse_cached(
+                        upload,
+                        "biomarker_extractor",
+                        EXTRACTOR_VERSION,
+                        extract_biomarkers_from_pdf
+                    )
+                return {
+                    "index": index,
+                    "filename": name,
+                    "biomarkers": biomarkers,
+                    "extraction_backend": current_notes().get("pdf_backend")
+                }
+            except HTTPException as exc:
+                return {"index": index, "filename": name, "error": exc.detail}
+            except Exception:
+                return {"index": index, "filename": name, "error": "Unable to read report"}
+
+    async def stream():
+        pending = {
+            asyncio.create_task(parse_one(index, *source))
+            for index, source in enumerate(sources)
+        }
+        scored = 0
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            parsed = [task.result() for task in done]
+            ready = [p for p in parsed if "biomarkers" in p]
+
+            # Everything that finished in this round is scored in one vectorized call.
+            if ready:
+                size = len(ready)
+                with stage("risk_engine_batch"):
+                    batch = calculate_risk_engine_batch(
+                        {
+                            key: [
+                                float("nan") if p["biomarkers"].get(key) is None else p["biomarkers"][key]
+                                for p in ready
+                            ]
+                            for key in BATCH_BIOMARKERS
+                        },
+                        None,
+                        {
+                            key: [float("nan") if value is None else value] * size
+                            for key, value in behavioral.items()
+                        },
+                        model
+                    )
+                rows = list(batch_result_rows(batch))
+                await run_in_threadpool(cohort_store.append, rows, [employer_id] * size)
+                for report, risk_result in zip(ready, rows):
+                    scored += 1
+                    yield json.dumps({**report, **risk_result}) + "\n"
+
+            for report in parsed:
+                if "error" in report:
+                    yield json.dumps(report) + "\n"
+
+        yield json.dumps({
+            "summary": {
+                "reports": len(sources),
+                "scored": scored,
+                "failed": len(sources) - scored
+            }
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/simulate-risk")
 async def simulate_risk(
     ldl: Optional[float] = None,
@@ -77,9 +352,13 @@ async def simulate_risk(
     hdl: Optional[float] = None,
     alt: Optional[float] = None,
     sleep_hours: Optional[float] = None,
-    stress_level: Optional[int] = None
+    stress_level: Optional[int] = None,
+    model_version: Optional[str] = None,
+    patient_id: Optional[str] = None
 ):
 
+    model = _risk_model(model_version)
+
     biomarkers = {
         "ldl": ldl,
         "triglycerides": triglycerides,
@@ -93,6 +372,88 @@ async def simulate_risk(
         "stress_level": stress_level
     }
 
-    result = calculate_risk_engine(biomarkers, demographics, behavioral)
+    if patient_id:
+        # What-if against the patient's last upload: only the given values
+        # change, and only the scoring nodes downstream of them are re-run.
+        baseline = risk_graphs.get(patient_id)
+        if baseline is None:
+            raise HTTPException(status_code=400, detail="Upload baseline first")
+        if baseline.model is not model:
+            baseline = RiskGraph(baseline.biomarkers, baseline.behavioral, model)
+
+        with stage("risk_engine"):
+            graph = baseline.update(
+                {k: v for k, v in biomarkers.items() if v is not None},
+                {k: v for k, v in behavioral.items() if v is not None}
+            )
+
+        return {
+            **graph.result(),
+            "baseline_risk_score": baseline.result()["risk_score"],
+            "recomputed": graph.recomputed,
+            "risk_explanation": graph.explain()
+        }
+
+    result = calculate_risk_engine(biomarkers, demographics, behavioral, model)
 
     return result
+
+
+@router.post("/intervention-search")
+async def intervention_search(request: InterventionSearchRequest):
+
+    model = _risk_model(request.model_version)
+
+    if request.target_score is None and request.target_level not in target_scores(model):
+        raise HTTPException(status_code=400, detail="Unknown target risk level")
+
+    unknown = set(request.costs) - set(DEFAULT_LEVERS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown levers: {', '.join(sorted(unknown))}")
+
+    levers = {
+        name: {**DEFAULT_LEVERS[name], "cost": cost}
+        for name, cost in request.costs.items()
+    }
+
+    return find_optimal_intervention(
+        request.biomarkers,
+        request.behavioral,
+        target_level=request.target_level,
+        target_score=request.target_score,
+        min_compliance=request.min_compliance,
+        levers=levers,
+        time_budget_ms=request.time_budget_ms or SEARCH_TIME_BUDGET_MS,
+        model=model
+    )
+
+
+@router.post("/simulate-population")
+async def population_simulation(request: PopulationSimulationRequest):
+
+    if not 1 <= request.paths <= 10000:
+        raise HTTPException(status_code=400, detail="paths must be between 1 and 10000")
+
+    if not request.horizons or min(request.horizons) < 1:
+        raise HTTPException(status_code=400, detail="horizons must be positive years")
+
+    markers = len(BATCH_BIOMARKERS)
+    if request.drift is not None and len(request.drift) != markers:
+        raise HTTPException(status_code=400, detail=f"drift needs {markers} values")
+    if request.covariance is not None and (
+        len(request.covariance) != markers or any(len(row) != markers for row in request.covariance)
+    ):
+        raise HTTPException(status_code=400, detail=f"covariance must be {markers}x{markers}")
+
+    try:
+        return await run_in_threadpool(
+            simulate_population,
+            request.patients,
+            paths=request.paths,
+            horizons=request.horizons,
+            drift=request.drift,
+            covariance=request.covariance,
+            seed=request.seed
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException
+from app.services.risk_model import load_models, activate_model, describe_models
+
+router = APIRouter(prefix="/risk-models")
+
+
+@router.get("")
+async def list_models():
+    return describe_models()
+
+
+@router.post("/reload")
+async def reload_models():
+    # Applies to this worker only; each worker process holds its own registry.
+    try:
+        load_models()
+    except (OSError, ValueError, KeyError) as exc:
+        raise HTTPException(status_code=400, detail=f"Model reload failed: {exc}")
+    return describe_models()
+
+
+@router.post("/{version}/activate")
+async def activate(version: str):
+    try:
+        activate_model(version)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return describe_models()
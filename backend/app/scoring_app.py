@@ -0,0 +1,155 @@
+from typing import Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.config import COLUMNAR_CHUNK_ROWS
+from app.models.schemas import ScoreRequest, ScoreBatchRequest
+from app.routes.risk_routes import router as risk_model_router
+from app.services.metrics import instrument_request, render_metrics, stage
+from app.services.risk_engine import calculate_risk_engine, calculate_risk_engine_batch, batch_result_rows
+from app.services.risk_model import get_model
+from app.services.risk_attribution import risk_attribution, risk_attribution_batch, attribution_rows
+from app.services.uploads import limit_upload_body
+from app.services.columnar import (
+    ARROW_STREAM,
+    CSV,
+    OUTPUT_FORMATS,
+    ColumnarError,
+    media_type,
+    open_table,
+    score_chunks,
+    arrow_stream,
+    csv_stream,
+    load_pyarrow
+)
+
+# Scoring-only profile: JSON in, risk results out. Nothing here imports the
+# PDF parsers, the LLM client, the parse pool or the cohort/state stores, so
+# a worker is ready as soon as FastAPI and NumPy are loaded.
+#
+#     uvicorn app.scoring_app:app
+
+app = FastAPI(title="Hybrid Preventive Intelligence System - Scoring")
+
+app.middleware("http")(limit_upload_body)
+app.middleware("http")(instrument_request)
+app.include_router(risk_model_router)
+
+
+def _risk_model(version):
+    try:
+        return get_model(version)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.post("/score")
+async def score(request: ScoreRequest):
+
+    model = _risk_model(request.model_version)
+
+    with stage("risk_engine"):
+        result = calculate_risk_engine(
+            request.biomarkers,
+            request.demographics,
+            request.behavioral,
+            model
+        )
+
+    if request.explain:
+        with stage("risk_attribution"):
+            result["risk_attribution"] = risk_attribution(request.biomarkers, request.behavioral, model)
+
+    return result
+
+
+@app.post("/score/batch")
+async def score_batch(request: ScoreBatchRequest):
+
+    model = _risk_model(request.model_version)
+    results = [None] * len(request.rows)
+
+    # The scalar engine treats an empty behavioral block as the default index,
+    # so rows with and without one are scored as separate batches.
+    groups = {}
+    for index, row in enumerate(request.rows):
+        groups.setdefault(bool(row.behavioral), []).append(index)
+
+    with stage("risk_engine_batch"):
+        for has_behavioral, indices in groups.items():
+            rows = [request.rows[i] for i in indices]
+            column = lambda values, name: np.array(
+                [np.nan if values(row).get(name) is None else values(row)[name] for row in rows],
+                dtype=float
+            )
+            biomarkers = {name: column(lambda row: row.biomarkers, name) for name in model.markers}
+            behavioral = {
+                name: column(lambda row: row.behavioral, name)
+                for name, _, _, _ in model.behavioral_factors
+            } if has_behavioral else None
+            batch = calculate_risk_engine_batch(biomarkers, None, behavioral, model)
+            for i, result in zip(indices, batch_result_rows(batch)):
+                results[i] = result
+            if request.explain:
+                attribution = risk_attribution_batch(biomarkers, behavioral, model)
+                for i, explained in zip(indices, attribution_rows(attribution, model)):
+                    results[i]["risk_attribution"] = explained
+
+    return {"model_version": model.version, "results": results}
+
+
+@app.post("/score/columnar")
+async def score_columnar(
+    request: Request,
+    model_version: Optional[str] = None,
+    id_column: str = "patient_id",
+    explain: bool = False
+):
+
+    # Body: Arrow IPC (stream or file), Parquet or CSV, one row per patient,
+    # columns named after the model's markers and behavioral factors plus an
+    # optional id column that is echoed back. The response is an Arrow IPC
+    # stream or CSV (per Accept, defaulting to the input's family), written
+    # chunk by chunk as rows are scored. With explain=true every row also
+    # carries its Shapley attributions as <marker>_attribution and
+    # <domain>_attribution columns.
+    model = _risk_model(model_version)
+    factors = [name for name, _, _, _ in model.behavioral_factors]
+    body = await request.body()
+
+    try:
+        present, chunks = open_table(
+            body,
+            request.headers.get("content-type"),
+            list(model.markers) + factors,
+            id_column,
+            COLUMNAR_CHUNK_ROWS
+        )
+        output = media_type(request.headers.get("accept"))
+        if output not in OUTPUT_FORMATS:
+            output = CSV if media_type(request.headers.get("content-type")) == CSV else ARROW_STREAM
+        if output == ARROW_STREAM:
+            load_pyarrow()
+    except ColumnarError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+    markers = [name for name in present if name in model.markers]
+    if not markers:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No biomarker columns found; expected some of {', '.join(model.markers)}"
+        )
+
+    write = arrow_stream if output == ARROW_STREAM else csv_stream
+    return StreamingResponse(
+        write(score_chunks(chunks, model, markers, [f for f in factors if f in present], explain), id_column),
+        media_type=output,
+        headers={"X-Model-Version": model.version}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,15 +1,83 @@
+import asyncio
+import hashlib
+import json
 import os
-from groq import Groq
+import threading
+from collections import OrderedDict
+
+from app.config import (
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_CACHE_SIZE
+)
+from app.services.metrics import CACHE_REQUESTS, LLM_FALLBACKS, LLM_IN_FLIGHT, stage
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+
+FALLBACK_REPORT = "AI generation unavailable. Deterministic engine active."
+
+_clients = {}
+_limiter = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_report_cache = OrderedDict()
+_inflight = {}
+_cache_lock = threading.Lock()
+
+
+# groq and httpx are imported when the first client is built, so importing
+# this module stays cheap for processes that never call the LLM.
+def get_async_client():
+    # One pooled client per process; connections are reused across requests.
+    if "async" not in _clients:
+        import httpx
+        from groq import AsyncGroq
+
+        _clients["async"] = AsyncGroq(
+            api_key=GROQ_API_KEY,
+            base_url=GROQ_BASE_URL,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=1,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                )
+            )
+        )
+    return _clients["async"]
+
+
+def report_cache_key(biomarkers, risk_result):
+    canonical = json.dumps(
+        {"model": GROQ_MODEL, "biomarkers": biomarkers, "risk_result": risk_result},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def cached_report(key):
+    with _cache_lock:
+        report = _report_cache.get(key)
+        if report is not None:
+            _report_cache.move_to_end(key)
+    CACHE_REQUESTS.inc(cache="llm_report", result="miss" if report is None else "hit")
+    return report
 
-client = Groq(api_key=GROQ_API_KEY)
 
+def cache_report(key, report):
+    with _cache_lock:
+        _report_cache[key] = report
+        _report_cache.move_to_end(key)
+        while len(_report_cache) > LLM_CACHE_SIZE:
+            _report_cache.popitem(last=False)
 
-def generate_ai_clinical_report(biomarkers, risk_result):
 
-    prompt = f"""
+def build_prompt(biomarkers, risk_result):
+
+    return f"""
 You are a preventive medicine intelligence specialist.
 
 Strict rules:
@@ -44,13 +112,45 @@ Domain-specific interventions.
 Reassessment timeline adjusted to risk severity and data completeness.
 """
 
+
+async def _request_report(key, biomarkers, risk_result):
+
     try:
-        completion = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1200
-        )
-        return completion.choices[0].message.content.strip()
+        async with _limiter:
+            with LLM_IN_FLIGHT.track():
+                completion = await asyncio.wait_for(
+                    get_async_client().chat.completions.create(
+                        model=GROQ_MODEL,
+                        messages=[{"role": "user", "content": build_prompt(biomarkers, risk_result)}],
+                        temperature=0.3,
+                        max_tokens=1200
+                    ),
+                    LLM_TIMEOUT_SECONDS
+                )
+        report = completion.choices[0].message.content.strip()
     except Exception:
-        return "AI generation unavailable. Deterministic engine active."
+        LLM_FALLBACKS.inc()
+        return FALLBACK_REPORT
+
+    cache_report(key, report)
+    return report
+
+
+async def generate_ai_clinical_report_async(biomarkers, risk_result):
+
+    key = report_cache_key(biomarkers, risk_result)
+    report = cached_report(key)
+    if report is not None:
+        return report
+
+    # Identical concurrent requests share a single completion call.
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_request_report(key, biomarkers, risk_result))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # Timed here rather than in the task so deduplicated callers each see
+    # their own wait in the "llm" stage.
+    with stage("llm"):
+        return await asyncio.shield(task)
@@ -1,17 +1,19 @@
-def generate_clinical_summary(biomarkers):
+from app.services.risk_model import get_model
 
-    findings = []
 
-    if biomarkers.get("ldl") and biomarkers["ldl"] > 130:
-        findings.append("Elevated LDL increasing cardiovascular risk.")
+def generate_clinical_summary(biomarkers, model=None):
 
-    if biomarkers.get("triglycerides") and biomarkers["triglycerides"] > 200:
-        findings.append("High triglycerides suggesting metabolic dysfunction.")
+    model = model or get_model()
 
-    if biomarkers.get("alt") and biomarkers["alt"] > 250:
-        findings.append("Marked ALT elevation indicating significant hepatic stress.")
+    findings = []
 
-    if biomarkers.get("vitamin_d") and biomarkers["vitamin_d"] < 30:
-        findings.append("Vitamin D insufficiency detected.")
+    for rule in model.clinical_findings:
+        value = biomarkers.get(rule["marker"])
+        if not value:
+            continue
+        if "above" in rule and value > rule["above"]:
+            findings.append(rule["text"])
+        elif "below" in rule and value < rule["below"]:
+            findings.append(rule["text"])
 
     return " ".join(findings) if findings else "No major abnormalities detected."
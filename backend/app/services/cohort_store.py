@@ -0,0 +1,299 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.config import COHORT_DATA_DIR
+from app.services.risk_engine import RISK_DOMAINS
+from app.services.risk_model import get_model
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+AGE_BANDS = ["<30", "30-39", "40-49", "50-59", "60+"]
+AGE_EDGES = [30, 40, 50, 60]
+SCORE_BINS = np.arange(0, 110, 10)
+PERCENTILES = [10, 25, 50, 75, 90]
+
+COLUMNS = {
+    "timestamp": ("float64", ()),
+    "risk_score": ("int16", ()),
+    "risk_level": ("int8", ()),
+    "priority": ("int8", ()),
+    "risk_vector": ("float32", (len(RISK_DOMAINS),)),
+    "employer": ("int32", ()),
+    "gender": ("int16", ()),
+    "age": ("int16", ()),
+}
+
+
+class CohortStore:
+
+    # Append-only column files read back through np.memmap, so queries touch
+    # only the columns they aggregate and never materialize per-row objects.
+    # rows.json holds the committed row count; it is replaced only after
+    # every column has its rows, so a crash mid-append leaves a tail past
+    # the count that readers ignore and the next writer cuts off.
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.dictionary_path = os.path.join(directory, "dictionary.json")
+        self.rows_path = os.path.join(directory, "rows.json")
+        self.dictionaries = {"employer": [], "gender": [], "risk_level": []}
+        self.dictionary_mtime = None
+        self._load_dictionaries()
+        if os.path.isdir(directory):
+            with self._exclusive():
+                self._truncate(self.rows())
+
+    def _load_dictionaries(self):
+        # Other workers append codes too; re-read whenever the file changed.
+        # It is replaced atomically, so a reader never sees a partial write.
+        try:
+            mtime = os.stat(self.dictionary_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.dictionary_mtime:
+            with open(self.dictionary_path) as handle:
+                self.dictionaries = {"risk_level": [], **json.load(handle)}
+            self.dictionary_mtime = mtime
+
+    def _seed_levels(self):
+        # Risk levels are coded like employers, seeded in the active model's
+        # order so level codes written before the column was dictionary-coded
+        # keep their meaning. Other model versions add their labels on use.
+        levels = self.dictionaries["risk_level"]
+        if not levels:
+            levels.extend(label for _, label in get_model().level_rules)
+
+    def _save_dictionaries(self):
+        temporary = self.dictionary_path + ".tmp"
+        with open(temporary, "w") as handle:
+            json.dump(self.dictionaries, handle)
+        os.replace(temporary, self.dictionary_path)
+        self.dictionary_mtime = os.stat(self.dictionary_path).st_mtime_ns
+
+    @contextmanager
+    def _exclusive(self):
+        # Thread lock for this process, flock for the other workers.
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _row_bytes(self, name):
+        dtype, shape = COLUMNS[name]
+        return np.dtype(dtype).itemsize * int(np.prod(shape))
+
+    def _truncate(self, rows):
+        # Drops rows a crashed append wrote past the committed count.
+        for name in COLUMNS:
+            path = self._path(name)
+            size = rows * self._row_bytes(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _commit(self, rows):
+        temporary = self.rows_path + ".tmp"
+        with open(temporary, "w") as handle:
+            json.dump({"rows": rows}, handle)
+        os.replace(temporary, self.rows_path)
+
+    def _encode(self, kind, values):
+        codes = []
+        dictionary = self.dictionaries[kind]
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        for value in values:
+            if value is None or value == "":
+                codes.append(-1)
+                continue
+            value = str(value).lower() if kind == "gender" else str(value)
+            if value not in lookup:
+                lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes.append(lookup[value])
+        return np.asarray(codes)
+
+    def append(self, risk_results, employers=None, genders=None, ages=None):
+        size = len(risk_results)
+        if not size:
+            return 0
+
+        vectors = np.array([
+            [result["risk_vector"][name] for name in RISK_DOMAINS]
+            for result in risk_results
+        ])
+        columns = {
+            "timestamp": np.full(size, time.time()),
+            "risk_score": [result["risk_score"] for result in risk_results],
+            "priority": [RISK_DOMAINS.index(result["risk_priorities"][0]) for result in risk_results],
+            "risk_vector": vectors,
+            "age": [-1 if age is None else age for age in (ages or [None] * size)],
+        }
+
+        # Codes are assigned under the file lock, against the dictionary as
+        # the last writer left it, so two workers never hand out one code
+        # for different values.
+        with self._exclusive():
+            self._load_dictionaries()
+            known = {kind: len(values) for kind, values in self.dictionaries.items()}
+            self._seed_levels()
+            columns["risk_level"] = self._encode("risk_level", [result["risk_level"] for result in risk_results])
+            columns["employer"] = self._encode("employer", employers or [None] * size)
+            columns["gender"] = self._encode("gender", genders or [None] * size)
+
+            # Dictionary first: a reader that counts the new rows always
+            # finds their codes when it loads the dictionary afterwards.
+            if any(len(values) != known[kind] for kind, values in self.dictionaries.items()):
+                self._save_dictionaries()
+            committed = self.rows()
+            self._truncate(committed)
+            for name, (dtype, _) in COLUMNS.items():
+                with open(self._path(name), "ab") as handle:
+                    handle.write(np.asarray(columns[name], dtype=dtype).tobytes())
+            self._commit(committed + size)
+
+        return size
+
+    def rows(self):
+        try:
+            with open(self.rows_path) as handle:
+                return json.load(handle)["rows"]
+        except FileNotFoundError:
+            pass
+        # Stores written before rows.json: the shortest column bounds them.
+        counts = []
+        for name in COLUMNS:
+            path = self._path(name)
+            counts.append(os.path.getsize(path) // self._row_bytes(name) if os.path.exists(path) else 0)
+        return min(counts)
+
+    def column(self, name, rows=None):
+        dtype, shape = COLUMNS[name]
+        rows = self.rows() if rows is None else rows
+        if rows == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,) + shape)
+
+    def groups(self, group_by, rows, employer=None):
+        # Returns the row mask and dense group codes with their labels.
+        self._load_dictionaries()
+        mask = np.ones(rows, dtype=bool)
+        if employer is not None:
+            dictionary = self.dictionaries["employer"]
+            code = dictionary.index(employer) if employer in dictionary else -2
+            mask &= np.asarray(self.column("employer", rows)) == code
+
+        if group_by is None:
+            return mask, np.zeros(rows, dtype=np.int64), ["all"]
+
+        if group_by == "age_band":
+            age = np.asarray(self.column("age", rows))
+            codes = np.where(age < 0, len(AGE_BANDS), np.digitize(age, AGE_EDGES))
+            return mask, codes, AGE_BANDS + ["unknown"]
+
+        if group_by in ("employer", "gender"):
+            raw = np.asarray(self.column(group_by, rows)).astype(np.int64)
+            labels = list(self.dictionaries[group_by])
+            return mask, np.where((raw < 0) | (raw >= len(labels)), len(labels), raw), labels + ["unknown"]
+
+        raise ValueError(f"Unsupported group_by: {group_by}")
+
+    def _grouped(self, group_by, employer):
+        rows = self.rows()
+        mask, codes, labels = self.groups(group_by, rows, employer)
+        return rows, mask, codes[mask], labels
+
+    def _counts(self, codes, values, width, labels):
+        counts = np.bincount(codes * width + values, minlength=len(labels) * width)
+        return counts.reshape(len(labels), width)
+
+    def distribution(self, group_by=None, employer=None):
+        rows, mask, codes, labels = self._grouped(group_by, employer)
+        scores = np.asarray(self.column("risk_score", rows))[mask]
+        bins = np.minimum(scores // 10, 9).astype(np.int64)
+        counts = self._counts(codes, bins, 10, labels)
+        return {
+            "bins": [f"{low}-{low + 9 if low < 90 else 100}" for low in SCORE_BINS[:-1]],
+            "groups": {
+                label: counts[i].tolist()
+                for i, label in enumerate(labels) if counts[i].sum()
+            }
+        }
+
+    def percentiles(self, group_by=None, employer=None):
+        rows, mask, codes, labels = self._grouped(group_by, employer)
+        scores = np.asarray(self.column("risk_score", rows))[mask]
+
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        ordered = scores[order]
+
+        result = {}
+        for i, label in enumerate(labels):
+            group = ordered[boundaries[i]:boundaries[i + 1]]
+            if len(group):
+                values = np.percentile(group, PERCENTILES)
+                result[label] = {
+                    "members": int(len(group)),
+                    "mean": round(float(group.mean()), 1),
+                    **{f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, values)}
+                }
+        return {"groups": result}
+
+    def risk_level_mix(self, group_by=None, employer=None):
+        rows, mask, codes, labels = self._grouped(group_by, employer)
+        levels = np.asarray(self.column("risk_level", rows))[mask].astype(np.int64)
+        self._seed_levels()
+        categories = self.dictionaries["risk_level"]
+        counts = self._counts(codes, levels, len(categories), labels)
+        return {"groups": self._shares(counts, labels, categories)}
+
+    def domain_priorities(self, group_by=None, employer=None):
+        rows, mask, codes, labels = self._grouped(group_by, employer)
+        priorities = np.asarray(self.column("priority", rows))[mask].astype(np.int64)
+        vectors = np.asarray(self.column("risk_vector", rows))[mask]
+        counts = self._counts(codes, priorities, len(RISK_DOMAINS), labels)
+
+        sums = np.stack([
+            np.bincount(codes, weights=vectors[:, j], minlength=len(labels))
+            for j in range(len(RISK_DOMAINS))
+        ], axis=1)
+        members = counts.sum(axis=1, keepdims=True)
+        means = sums / np.maximum(members, 1)
+
+        shares = self._shares(counts, labels, RISK_DOMAINS)
+        for i, label in enumerate(labels):
+            if label in shares:
+                shares[label]["mean_risk_vector"] = {
+                    name: round(float(means[i, j]), 3) for j, name in enumerate(RISK_DOMAINS)
+                }
+        return {"groups": shares}
+
+    def _shares(self, counts, labels, categories):
+        result = {}
+        for i, label in enumerate(labels):
+            total = int(counts[i].sum())
+            if total:
+                result[label] = {
+                    "members": total,
+                    "share": {
+                        name: round(int(counts[i, j]) / total, 4)
+                        for j, name in enumerate(categories)
+                    }
+                }
+        return result
+
+
+cohort_store = CohortStore(COHORT_DATA_DIR)
@@ -0,0 +1,221 @@
+import csv
+import io
+
+import numpy as np
+
+from app.services.risk_engine import calculate_risk_engine_batch
+from app.services.risk_attribution import risk_attribution_batch
+
+# One row per patient in, one row per patient out. Arrow and Parquet need
+# pyarrow, which is imported on first use like the PDF libraries; CSV is
+# read and written with the standard library and NumPy only.
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+PARQUET = "application/vnd.apache.parquet"
+CSV = "text/csv"
+
+INPUT_FORMATS = {
+    ARROW_STREAM: "arrow_stream",
+    ARROW_FILE: "arrow_file",
+    PARQUET: "parquet",
+    "application/x-parquet": "parquet",
+    CSV: "csv"
+}
+OUTPUT_FORMATS = (ARROW_STREAM, CSV)
+
+
+class ColumnarError(ValueError):
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ColumnarError(415, "Arrow and Parquet bodies need pyarrow installed; send text/csv instead")
+    return pyarrow
+
+
+def media_type(header):
+    return (header or "").split(";")[0].strip().lower()
+
+
+def _arrow_chunks(pa, table, fields, chunk_rows):
+    # Casts every model column up front so a non-numeric value is a 400, not
+    # a stream that stops after the 200 went out.
+    columns = {}
+    for name, column in fields.items():
+        if name is None:
+            continue
+        try:
+            columns[name] = pa.compute.cast(table.column(column), pa.float64())
+        except pa.ArrowException as exc:
+            raise ColumnarError(400, f"Column {column!r} is not numeric: {exc}")
+    ids = table.column(fields[None]) if None in fields else None
+
+    # An empty table still yields one (empty) chunk so the response carries
+    # the result schema or CSV header.
+    for offset in range(0, max(table.num_rows, 1), chunk_rows):
+        yield {
+            name: values.slice(offset, chunk_rows).to_numpy(zero_copy_only=False)
+            for name, values in columns.items()
+        }, ids.slice(offset, chunk_rows).combine_chunks() if ids is not None else None
+
+
+def _csv_chunks(reader, header, fields, chunk_rows):
+    positions = {name: header.index(column) for name, column in fields.items()}
+    chunks = []
+    line = 1
+    while True:
+        rows = [row for _, row in zip(range(chunk_rows), reader)]
+        if rows or not chunks:
+            columns = {
+                name: np.array([_csv_float(row, i, line + n, header) for n, row in enumerate(rows, 1)], dtype=float)
+                for name, i in positions.items() if name is not None
+            }
+            ids = [row[positions[None]] if positions[None] < len(row) else "" for row in rows] if None in positions else None
+            chunks.append((columns, ids))
+        if not rows:
+            return chunks
+        line += len(rows)
+
+
+def _csv_float(row, i, line, header):
+    value = row[i].strip() if i < len(row) else ""
+    if not value:
+        return np.nan
+    try:
+        return float(value)
+    except ValueError:
+        raise ColumnarError(400, f"Line {line}, column {header[i]!r}: {value!r} is not a number")
+
+
+def open_table(body, content_type, names, id_column, chunk_rows):
+
+    # Returns (columns present, list of (column arrays, ids) chunks). The
+    # whole body is decoded and validated here, before the response starts;
+    # scoring and encoding still happen chunk by chunk while streaming.
+    kind = INPUT_FORMATS.get(media_type(content_type))
+    if kind is None:
+        raise ColumnarError(415, f"Unsupported content type; send one of {', '.join(sorted(set(INPUT_FORMATS)))}")
+
+    if kind == "csv":
+        try:
+            reader = csv.reader(io.TextIOWrapper(io.BytesIO(body), encoding="utf-8-sig", newline=""))
+            header = [column.strip() for column in next(reader, [])]
+            present = [name for name in names if name in header]
+            fields = {name: name for name in present}
+            if id_column in header:
+                fields[None] = id_column
+            return present, _csv_chunks(reader, header, fields, chunk_rows)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ColumnarError(400, f"Unreadable CSV body: {exc}")
+
+    pa = load_pyarrow()
+    try:
+        buffer = pa.BufferReader(body)
+        if kind == "arrow_stream":
+            table = pa.ipc.open_stream(buffer).read_all()
+        elif kind == "arrow_file":
+            table = pa.ipc.open_file(buffer).read_all()
+        else:
+            table = pa.parquet.ParquetFile(buffer).read()
+    except (pa.ArrowException, OSError) as exc:
+        raise ColumnarError(400, f"Unreadable {kind.replace('_', ' ')} body: {exc}")
+
+    present = [name for name in names if name in table.column_names]
+    fields = {name: name for name in present}
+    if id_column in table.column_names:
+        fields[None] = id_column
+    return present, list(_arrow_chunks(pa, table, fields, chunk_rows))
+
+
+def score_chunks(chunks, model, markers, factors, explain=False):
+    # Each chunk is one vectorized call. Without any behavioral column every
+    # row gets the model's default index, as the scalar engine does for an
+    # empty behavioral block; with one, nulls count as missing factors.
+    for columns, ids in chunks:
+        biomarkers = {name: columns[name] for name in markers}
+        behavioral = {name: columns[name] for name in factors} if factors else None
+        batch = calculate_risk_engine_batch(biomarkers, None, behavioral, model)
+        if explain:
+            batch["risk_attribution"] = risk_attribution_batch(biomarkers, behavioral, model)
+        yield batch, ids
+
+
+def result_columns(batch, ids, id_column):
+    columns = {}
+    if ids is not None:
+        columns[id_column] = ids
+    columns["risk_score"] = batch["risk_score"]
+    columns["risk_level"] = batch["risk_level"]
+    columns["risk_trajectory"] = batch["risk_trajectory"]
+    columns.update(batch["risk_vector"])
+    columns.update(batch["event_probability_projection"])
+    columns.update(batch["risk_uncertainty"])
+    columns["risk_priorities"] = batch["risk_priorities"]
+
+    attribution = batch.get("risk_attribution")
+    if attribution is not None:
+        columns["biomarker_attribution_base"] = attribution["biomarker_base"]
+        columns.update((f"{name}_attribution", values) for name, values in attribution["biomarkers"].items())
+        columns["domain_attribution_base"] = attribution["domain_base"]
+        columns.update((f"{name}_attribution", values) for name, values in attribution["domains"].items())
+    return columns
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def arrow_stream(scored, id_column):
+    # Arrow IPC stream: the schema goes out with the first scored chunk and
+    # every later chunk is flushed as its own record batch message.
+    pa = load_pyarrow()
+    buffer = io.BytesIO()
+    writer = None
+
+    for batch, ids in scored:
+        columns = result_columns(batch, ids, id_column)
+        columns["risk_priorities"] = pa.array(columns["risk_priorities"].tolist(), pa.list_(pa.string()))
+        if ids is not None and not isinstance(ids, (pa.Array, pa.ChunkedArray)):
+            columns[id_column] = pa.array(ids, pa.string())
+        record = pa.record_batch(columns)
+
+        if writer is None:
+            writer = pa.ipc.new_stream(buffer, record.schema)
+        writer.write_batch(record)
+        yield _drain(buffer)
+
+    if writer is not None:
+        writer.close()
+        yield _drain(buffer)
+
+
+def csv_stream(scored, id_column):
+    buffer = io.StringIO()
+    out = csv.writer(buffer)
+    header = False
+
+    for batch, ids in scored:
+        columns = result_columns(batch, ids, id_column)
+        columns["risk_priorities"] = ["|".join(row) for row in columns["risk_priorities"].tolist()]
+        if not header:
+            out.writerow(columns)
+            header = True
+        out.writerows(zip(*(
+            values.tolist() if isinstance(values, np.ndarray)
+            else values.to_pylist() if hasattr(values, "to_pylist") else values
+            for values in columns.values()
+        )))
+        yield _drain(buffer).encode()
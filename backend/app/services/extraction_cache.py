@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import (
+    EXTRACTION_CACHE_SIZE,
+    EXTRACTION_CACHE_PATH,
+    EXTRACTION_CACHE_DISK_ENTRIES
+)
+
+
+def pdf_digest(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class ExtractionCache:
+
+    def __init__(self, max_entries=512, disk_path=None, max_disk_entries=50000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, version TEXT, biomarkers TEXT, accessed REAL)"
+            )
+            self.db.commit()
+
+    def get_memory(self, digest, namespace, version):
+        key = f"{namespace}:{digest}"
+
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry and entry["version"] == version:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return dict(entry["biomarkers"])
+
+            # With a disk tier the miss is counted by get_disk.
+            if self.db is None:
+                self.misses += 1
+            return None
+
+    def get_disk(self, digest, namespace, version):
+        # Blocking SQLite read and access-time update; async callers run it
+        # in the threadpool. db_lock keeps it from holding up memory lookups.
+        key = f"{namespace}:{digest}"
+
+        with self.db_lock:
+            row = self.db.execute(
+                "SELECT version, biomarkers FROM extractions WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row and row[0] == version:
+                self.db.execute(
+                    "UPDATE extractions SET accessed = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+                self.db.commit()
+                biomarkers = json.loads(row[1])
+                with self.lock:
+                    self._remember(key, version, biomarkers)
+                    self.disk_hits += 1
+                return dict(biomarkers)
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put_memory(self, digest, namespace, version, biomarkers):
+        with self.lock:
+            self._remember(f"{namespace}:{digest}", version, dict(biomarkers))
+
+    def put_disk(self, digest, namespace, version, biomarkers):
+        # Blocking, like get_disk.
+        with self.db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?)",
+                (f"{namespace}:{digest}", version, json.dumps(biomarkers), time.time())
+            )
+            overflow = self.db.execute(
+                "SELECT COUNT(*) FROM extractions"
+            ).fetchone()[0] - self.max_disk_entries
+            if overflow > 0:
+                self.db.execute(
+                    "DELETE FROM extractions WHERE key IN ("
+                    "SELECT key FROM extractions ORDER BY accessed LIMIT ?)",
+                    (overflow,)
+                )
+                with self.lock:
+                    self.evictions += overflow
+            self.db.commit()
+
+    def _remember(self, key, version, biomarkers):
+        self.memory[key] = {"version": version, "biomarkers": biomarkers}
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        if self.db is not None:
+            with self.db_lock:
+                self.db.execute("DELETE FROM extractions")
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "memory_entries": len(self.memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+extraction_cache = ExtractionCache(
+    max_entries=EXTRACTION_CACHE_SIZE,
+    disk_path=EXTRACTION_CACHE_PATH,
+    max_disk_entries=EXTRACTION_CACHE_DISK_ENTRIES
+)
+
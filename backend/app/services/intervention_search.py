@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+
+from app.config import SEARCH_TIME_BUDGET_MS, SEARCH_BEAM_WIDTH, SEARCH_MAX_EVALUATIONS
+from app.services.risk_engine import calculate_risk_engine_batch, resolve_model
+
+# step: change applied per unit of effort, limit: value the lever stops at,
+# cost: effort per step, compliance: probability a single step is sustained.
+DEFAULT_LEVERS = {
+    "ldl": {"step": -10, "limit": 70, "cost": 1.0, "compliance": 0.95},
+    "triglycerides": {"step": -25, "limit": 100, "cost": 1.0, "compliance": 0.95},
+    "hdl": {"step": 5, "limit": 70, "cost": 1.5, "compliance": 0.92},
+    "alt": {"step": -20, "limit": 25, "cost": 1.0, "compliance": 0.95},
+    "ast": {"step": -15, "limit": 25, "cost": 1.0, "compliance": 0.95},
+    "hs_crp": {"step": -0.5, "limit": 0.5, "cost": 1.0, "compliance": 0.95},
+    "hba1c": {"step": -0.2, "limit": 5.2, "cost": 1.5, "compliance": 0.93},
+    "vitamin_d": {"step": 5, "limit": 50, "cost": 0.5, "compliance": 0.98},
+    "sleep_hours": {"step": 0.5, "limit": 8, "cost": 1.0, "compliance": 0.9},
+    "stress_level": {"step": -1, "limit": 2, "cost": 1.2, "compliance": 0.9},
+    "exercise_days": {"step": 1, "limit": 5, "cost": 1.0, "compliance": 0.9},
+    "alcohol_frequency": {"step": -1, "limit": 0, "cost": 0.8, "compliance": 0.92},
+}
+
+
+def target_scores(model=None):
+    # A level is reached once the score is under its upper bound; the open
+    # top level has none and cannot be a target.
+    model = resolve_model(model)
+    return {label: below for below, label in model.level_rules if below is not None}
+
+
+def _max_steps(value, lever):
+    room = (lever["limit"] - value) / lever["step"]
+    return max(0, int(np.floor(room + 1e-9)))
+
+
+def find_optimal_intervention(
+    biomarkers,
+    behavioral=None,
+    target_level="Low Risk",
+    target_score=None,
+    min_compliance=0.3,
+    levers=None,
+    time_budget_ms=SEARCH_TIME_BUDGET_MS,
+    beam_width=SEARCH_BEAM_WIDTH,
+    max_evaluations=SEARCH_MAX_EVALUATIONS,
+    model=None
+):
+
+    model = resolve_model(model)
+    markers = list(model.markers)
+    factors = [name for name, _, _, _ in model.behavioral_factors]
+    behavioral = behavioral or {}
+    threshold = target_score if target_score is not None else target_scores(model)[target_level]
+    levers = {**DEFAULT_LEVERS, **(levers or {})}
+
+    # Only markers that were actually measured can be moved.
+    current = {**biomarkers, **behavioral}
+    active = [
+        name for name, lever in levers.items()
+        if current.get(name) is not None and _max_steps(current[name], lever) > 0
+    ]
+    values = np.array([current[name] for name in active], dtype=float)
+    steps = np.array([levers[name]["step"] for name in active], dtype=float)
+    limits = np.array([_max_steps(current[name], levers[name]) for name in active])
+    costs = np.array([levers[name]["cost"] for name in active], dtype=float)
+    log_compliance = np.log([levers[name]["compliance"] for name in active])
+    log_floor = np.log(min_compliance) if min_compliance > 0 else -np.inf
+
+    def score(states):
+        matrix = values + np.asarray(states) * steps
+        columns = {
+            name: np.full(len(states), np.nan if current.get(name) is None else current[name], dtype=float)
+            for name in markers + factors
+        }
+        for i, name in enumerate(active):
+            columns[name] = matrix[:, i]
+        batch = calculate_risk_engine_batch(
+            {name: columns[name] for name in markers},
+            None,
+            {name: columns[name] for name in factors} if behavioral else None,
+            model
+        )
+        return batch["risk_score"], batch["risk_composite"]
+
+    start = time.perf_counter()
+    origin = (0,) * len(active)
+    baseline_score = int(score([origin])[0][0])
+
+    def children(state, cost, ceiling):
+        for i in range(len(active)):
+            if state[i] >= limits[i] or cost + costs[i] >= ceiling:
+                continue
+            child = state[:i] + (state[i] + 1,) + state[i + 1:]
+            if child in seen or np.dot(child, log_compliance) < log_floor:
+                continue
+            seen.add(child)
+            yield cost + costs[i], child
+
+    # Beam search: every round scores all one-step extensions of the beam in a
+    # single batch and keeps the states with the lowest unclamped composite.
+    # After a hit, only states still cheaper than it are explored.
+    beam = [(0.0, origin)]
+    seen = {origin}
+    evaluated = 1
+    best = (baseline_score, 0.0, origin)
+    best_composite = np.inf
+    hit = best if baseline_score < threshold else None
+    reason = "target_reached" if hit else "exhausted"
+
+    while beam:
+        if (time.perf_counter() - start) * 1000 > time_budget_ms:
+            reason = "time_budget"
+            break
+        if evaluated >= max_evaluations:
+            reason = "evaluation_budget"
+            break
+
+        ceiling = hit[1] if hit else np.inf
+        candidates = [child for cost, state in beam for child in children(state, cost, ceiling)]
+        if not candidates:
+            break
+
+        scores, composites = score([state for _, state in candidates])
+        evaluated += len(candidates)
+
+        ranked = []
+        for (cost, state), value, composite in zip(candidates, scores, composites):
+            value = int(value)
+            if value < threshold:
+                if hit is None or cost < hit[1]:
+                    hit = (value, cost, state)
+                    reason = "target_reached"
+                continue
+            if composite < best_composite or (composite == best_composite and cost < best[1]):
+                best = (value, cost, state)
+                best_composite = composite
+            ranked.append((composite, cost, state))
+
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        beam = [(cost, state) for _, cost, state in ranked[:beam_width]]
+
+    found = hit is not None
+    if found:
+        best = hit
+        # Drop steps the plan does not need, cheapest-saving candidates scored together.
+        while True:
+            value, cost, state = best
+            trimmed = [
+                (cost - costs[i], state[:i] + (state[i] - 1,) + state[i + 1:])
+                for i in range(len(active)) if state[i] > 0
+            ]
+            if not trimmed:
+                break
+            scores, _ = score([candidate for _, candidate in trimmed])
+            evaluated += len(trimmed)
+            passing = [
+                (candidate_cost, int(value), candidate)
+                for (candidate_cost, candidate), value in zip(trimmed, scores)
+                if value < threshold
+            ]
+            if not passing:
+                break
+            candidate_cost, value, candidate = min(passing)
+            best = (value, candidate_cost, candidate)
+
+    value, cost, state = best
+    changes = [
+        {
+            "marker": name,
+            "from": current[name],
+            "to": round(float(values[i] + state[i] * steps[i]), 2),
+            "steps": int(state[i]),
+            "cost": round(float(state[i] * costs[i]), 2)
+        }
+        for i, name in enumerate(active) if state[i]
+    ]
+
+    return {
+        "target_risk_score": threshold,
+        "target_reached": found,
+        "stop_reason": reason,
+        "baseline_risk_score": baseline_score,
+        "risk_score": value,
+        "changes": changes,
+        "total_cost": round(float(cost), 2),
+        "compliance_probability": round(float(np.exp(np.dot(state, log_compliance))), 3),
+        "evaluated_scenarios": evaluated,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
@@ -0,0 +1,71 @@
+import re
+
+NUMBER = re.compile(r"\d+\.?\d*")
+
+
+class MarkerTable:
+
+    def __init__(self, markers=None, lines_ahead=0):
+        self.markers = dict(markers or {})
+        self.lines_ahead = lines_ahead
+        self._compile()
+
+    def _compile(self):
+        # One lookahead alternation of every label finds each position where
+        # some label starts without consuming it, so a label that runs on
+        # (vitamin.*?d) cannot swallow one that starts inside it. Labels are
+        # then matched one by one at those positions only.
+        self.labels = {name: re.compile(label, re.IGNORECASE) for name, label in self.markers.items()}
+        alternation = "|".join(f"(?:{label})" for label in self.markers.values())
+        self.pattern = re.compile(f"(?=(?:{alternation}))", re.IGNORECASE) if self.markers else None
+
+    def _hits(self, text, names):
+        # (name, end of its label) for every label in `names`, in text order.
+        for start in self.pattern.finditer(text):
+            for name in list(names):
+                label = self.labels[name].match(text, start.start())
+                if label:
+                    yield name, label.end()
+
+    def add(self, name, label):
+        self.markers[name] = label
+        self._compile()
+
+    def _value_end(self, text, start):
+        end = start
+        for _ in range(self.lines_ahead + 1):
+            end = text.find("\n", end)
+            if end == -1:
+                return len(text)
+            end += 1
+        return end - 1
+
+    def scan(self, text, found=None):
+        found = dict(found or {})
+        pending = {name for name in self.markers if found.get(name) is None}
+
+        if self.pattern is not None and pending:
+            for name, end in self._hits(text, pending):
+                if name not in pending:
+                    continue
+
+                number = NUMBER.search(text, end, self._value_end(text, end))
+                if number:
+                    found[name] = float(number.group())
+                    pending.discard(name)
+                    if not pending:
+                        break
+
+        return {name: found.get(name) for name in self.markers}
+
+    def mentions(self, text, names):
+        # Markers from `names` whose label appears in text, valued or not.
+        if self.pattern is None or not names:
+            return set()
+        return {name for name, _ in self._hits(text, set(names) & set(self.markers))}
+
+    def missing(self, found):
+        return {name for name in self.markers if found.get(name) is None}
+
+    def complete(self, found):
+        return all(found.get(name) is not None for name in self.markers)
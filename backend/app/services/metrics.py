@@ -0,0 +1,271 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+_trace = ContextVar("request_trace", default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, (), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labels, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), collect=None):
+        super().__init__(name, documentation, labels)
+        # collect() is read at scrape time for values owned by another object.
+        self.collect = collect
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        if self.collect is not None:
+            return [(self.name, (), (), self.collect())]
+        return super().samples()
+
+
+class Histogram(Metric):
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket
+                    samples.append((f"{self.name}_bucket", key, (("le", _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), total))
+                samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "health_ai_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "health_ai_requests_in_flight",
+    "HTTP requests currently being served."
+)
+STAGE_SECONDS = Histogram(
+    "health_ai_stage_duration_seconds",
+    "Time spent in each stage of report processing.",
+    ("stage",)
+)
+CACHE_REQUESTS = Counter(
+    "health_ai_cache_requests_total",
+    "Cache lookups by cache and result.",
+    ("cache", "result")
+)
+PARSE_FAILURES = Counter(
+    "health_ai_parse_failures_total",
+    "PDF parses that did not produce biomarkers, by reason.",
+    ("reason",)
+)
+LLM_FALLBACKS = Counter(
+    "health_ai_llm_fallbacks_total",
+    "Narrative requests answered with the deterministic fallback."
+)
+PDF_BACKENDS = Counter(
+    "health_ai_pdf_backend_total",
+    "Parsed documents by the most expensive PDF backend they needed.",
+    ("backend",)
+)
+LLM_IN_FLIGHT = Gauge(
+    "health_ai_llm_requests_in_flight",
+    "Completion calls currently waiting on the LLM provider."
+)
+
+
+class Trace:
+
+    # Per-request record: stage timings plus small notes (e.g. which PDF
+    # backend handled the document) for the response and metrics.
+
+    def __init__(self):
+        self.timings = []
+        self.notes = {}
+
+
+def start_trace():
+    return _trace.set(Trace())
+
+
+def stop_trace(token):
+    trace = _trace.get()
+    _trace.reset(token)
+    return trace or Trace()
+
+
+def add_timing(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.timings.append((stage, seconds))
+
+
+def record_timings(timings):
+    for stage, seconds in timings:
+        add_timing(stage, seconds)
+
+
+def annotate(key, value):
+    trace = _trace.get()
+    if trace is not None:
+        trace.notes[key] = value
+
+
+def current_notes():
+    trace = _trace.get()
+    return trace.notes if trace is not None else {}
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+def run_traced(fn, *args):
+    # Runs inside a parse worker process: timings and notes recorded there are
+    # returned with the result and replayed into the parent's trace.
+    token = start_trace()
+    try:
+        result = fn(*args)
+    finally:
+        trace = stop_trace(token)
+    return result, trace.timings, trace.notes
+
+
+async def instrument_request(request, call_next):
+    # HTTP middleware: request latency by route, requests in flight, and the
+    # request's stage timings as a Server-Timing header.
+    token = start_trace()
+    start = time.perf_counter()
+    status = 500
+    try:
+        with REQUESTS_IN_FLIGHT.track():
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        trace = stop_trace(token)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            elapsed,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status
+        )
+    response.headers["Server-Timing"] = server_timing(trace.timings, elapsed)
+    return response
+
+
+def server_timing(timings, total=None):
+    durations = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0) + seconds
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in durations.items())
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import time
+import uuid
+from collections import OrderedDict
+
+from app.config import NARRATIVE_WORKERS, NARRATIVE_JOB_RETENTION, NARRATIVE_QUEUE_DEPTH
+from app.services.ai_report_engine import generate_ai_clinical_report_async
+from app.services.metrics import Gauge
+
+
+class NarrativeJobs:
+
+    # Jobs, their queue and their status live in this process only. With
+    # several uvicorn workers, a job is visible only on the worker that
+    # accepted the upload, so polling that lands on another one gets a 404;
+    # run a single worker (or route report-jobs requests by affinity) when
+    # deferring narratives.
+
+    def __init__(self, workers=4, retention=10000, queue_depth=256):
+        self.workers = workers
+        self.retention = retention
+        self.queue_depth = queue_depth
+        self.jobs = OrderedDict()
+        self.events = {}
+        self.queue = None
+        self.tasks = []
+        self.rejected = 0
+
+    def _ensure_workers(self):
+        # Workers are bound to the serving event loop, so start them on first use.
+        # They run in an empty context: otherwise they would inherit the first
+        # request's trace and add every later job's LLM time to it.
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_depth)
+            self.tasks = [
+                asyncio.get_running_loop().create_task(self._worker(), context=contextvars.Context())
+                for _ in range(self.workers)
+            ]
+
+    async def _worker(self):
+        while True:
+            job_id, biomarkers, risk_result = await self.queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is not None:
+                    job["status"] = "running"
+                    job["ai_clinical_report"] = await generate_ai_clinical_report_async(
+                        biomarkers,
+                        risk_result
+                    )
+                    job["status"] = "completed"
+            except Exception:
+                job["status"] = "failed"
+            finally:
+                if job is not None:
+                    job["finished_at"] = time.time()
+                event = self.events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+                self.queue.task_done()
+
+    def submit(self, biomarkers, risk_result):
+        # Returns None when the queue is full; the caller then generates the
+        # narrative inline rather than piling up work it cannot finish.
+        self._ensure_workers()
+        if self.queue.full():
+            self.rejected += 1
+            return None
+
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "ai_clinical_report": None,
+            "created_at": time.time(),
+            "finished_at": None
+        }
+        self.events[job_id] = asyncio.Event()
+
+        while len(self.jobs) > self.retention:
+            expired, _ = self.jobs.popitem(last=False)
+            event = self.events.pop(expired, None)
+            if event is not None:
+                event.set()
+
+        self.queue.put_nowait((job_id, biomarkers, risk_result))
+        return job_id
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id, timeout=None):
+        event = self.events.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        return {
+            "workers": len(self.tasks),
+            "queued": self.queue.qsize() if self.queue else 0,
+            "tracked_jobs": len(self.jobs),
+            "rejected": self.rejected
+        }
+
+
+narrative_jobs = NarrativeJobs(
+    workers=NARRATIVE_WORKERS,
+    retention=NARRATIVE_JOB_RETENTION,
+    queue_depth=NARRATIVE_QUEUE_DEPTH
+)
+
+Gauge(
+    "health_ai_narrative_jobs_queued",
+    "Deferred narrative jobs waiting for a worker.",
+    collect=lambda: narrative_jobs.stats()["queued"]
+)
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.config import PARSE_WORKERS, PARSE_QUEUE_DEPTH, PARSE_TIMEOUT_SECONDS
+from app.services.extraction_cache import extraction_cache, pdf_digest
+from app.services.metrics import (
+    Gauge,
+    CACHE_REQUESTS,
+    PARSE_FAILURES,
+    PDF_BACKENDS,
+    annotate,
+    record_timings,
+    run_traced,
+    stage
+)
+
+
+class ParseExecutor:
+
+    # One single-process executor per worker. A parse holds its worker from
+    # submit to finish, so the timeout covers only the parse itself, and a
+    # stuck or crashed worker is replaced on its own without touching the
+    # parses running beside it.
+
+    def __init__(self, workers=4, max_pending=32, timeout=30.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.loop = None
+        self.idle = None
+        self.executors = set()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.latencies = deque(maxlen=1000)
+
+    def _spawn(self):
+        executor = ProcessPoolExecutor(max_workers=1)
+        self.executors.add(executor)
+        return executor
+
+    def _idle(self):
+        # The queue belongs to one event loop; a new loop (a restarted app,
+        # a test client) starts with fresh workers.
+        loop = asyncio.get_running_loop()
+        if self.idle is None or self.loop is not loop:
+            self.shutdown()
+            self.loop = loop
+            self.idle = asyncio.Queue()
+            for _ in range(self.workers):
+                self.idle.put_nowait(self._spawn())
+        return self.idle
+
+    async def prime(self, fn):
+        # Runs fn once in every worker, starting any that are not up yet.
+        self._idle()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, fn) for executor in list(self.executors)))
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            PARSE_FAILURES.inc(reason="rejected")
+            raise HTTPException(
+                status_code=503,
+                detail="PDF parser is saturated, retry shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        # `pending` follows the worker, not this coroutine: a parse keeps its
+        # slot until its worker is free again or has been replaced.
+        self.pending += 1
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        try:
+            executor = await self._idle().get()
+        except BaseException:
+            self.pending -= 1
+            raise
+
+        try:
+            future = executor.submit(run_traced, fn, *args)
+        except BrokenProcessPool:
+            self._release(executor, broken=True)
+            return self._crashed()
+        future.add_done_callback(lambda done: self._finished(loop, executor, done))
+
+        try:
+            result, timings, notes = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            self.completed += 1
+            record_timings(timings)
+            for key, value in notes.items():
+                annotate(key, value)
+            if "pdf_backend" in notes:
+                PDF_BACKENDS.inc(backend=notes["pdf_backend"])
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            PARSE_FAILURES.inc(reason="timeout")
+            # A parse a worker has picked up cannot be cancelled; that worker
+            # is killed and replaced when the future reports it broken.
+            if future.running():
+                self._kill(executor)
+            raise HTTPException(status_code=504, detail="PDF parsing timed out")
+        except BrokenProcessPool:
+            return self._crashed()
+        except Exception:
+            self.failed += 1
+            PARSE_FAILURES.inc(reason="unreadable")
+            raise HTTPException(status_code=422, detail="Unable to parse PDF")
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def _finished(self, loop, executor, future):
+        # Runs on the executor's management thread; the queue and counters
+        # are owned by the loop.
+        broken = not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+        try:
+            loop.call_soon_threadsafe(self._release, executor, broken)
+        except RuntimeError:
+            self._release(executor, broken)
+
+    def _release(self, executor, broken=False):
+        self.pending -= 1
+        if executor not in self.executors:
+            # Shut down since the parse started.
+            return
+        if broken:
+            self.replaced += 1
+            self.executors.discard(executor)
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = self._spawn()
+        self.idle.put_nowait(executor)
+
+    def _crashed(self):
+        self.failed += 1
+        PARSE_FAILURES.inc(reason="worker_crash")
+        raise HTTPException(status_code=503, detail="PDF parser restarted, retry shortly")
+
+    def _kill(self, executor):
+        # The executor notices its process is gone and fails the running
+        # future with BrokenProcessPool, which hands the slot back.
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            if process.is_alive():
+                process.terminate()
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.executors = set()
+        self.loop = None
+        self.idle = None
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            "workers": self.workers,
+            "in_flight": self.pending,
+            "queue_length": max(0, self.pending - self.workers),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "replaced_workers": self.replaced,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+                "p95": round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None,
+                "max": round(float(latencies.max()), 1) if len(latencies) else None
+            }
+        }
+
+
+parse_executor = ParseExecutor(
+    workers=PARSE_WORKERS,
+    max_pending=PARSE_QUEUE_DEPTH,
+    timeout=PARSE_TIMEOUT_SECONDS
+)
+
+Gauge(
+    "health_ai_parse_in_flight",
+    "PDF parses queued or running in the worker pool.",
+    collect=lambda: parse_executor.pending
+)
+
+
+async def parse_cached(source, namespace, version, extract):
+    # `source` is a SpooledPdf / UploadedPdf or raw PDF bytes. An upload is
+    # only turned into something the worker can open on a cache miss.
+    digest = getattr(source, "digest", None) or pdf_digest(source)
+
+    # Memory hits are answered on the event loop; the SQLite tier is blocking
+    # I/O, so it goes through the threadpool.
+    biomarkers = extraction_cache.get_memory(digest, namespace, version)
+    if biomarkers is None and extraction_cache.db is not None:
+        biomarkers = await run_in_threadpool(extraction_cache.get_disk, digest, namespace, version)
+    CACHE_REQUESTS.inc(cache="extraction", result="miss" if biomarkers is None else "hit")
+    if biomarkers is not None:
+        annotate("pdf_backend", "cache")
+    else:
+        document = source
+        if hasattr(source, "document"):
+            document = await run_in_threadpool(source.document)
+        with stage("parse"):
+            biomarkers = await parse_executor.run(extract, document)
+        extraction_cache.put_memory(digest, namespace, version, biomarkers)
+        if extraction_cache.db is not None:
+            await run_in_threadpool(extraction_cache.put_disk, digest, namespace, version, biomarkers)
+
+    return biomarkers
@@ -1,25 +1,171 @@
-import pdfplumber
+import os
+import time
 from io import BytesIO
+from app.config import PDF_PAGE_BUDGET
+from app.services.metrics import add_timing, annotate
 
+# Cheapest first; the value is the stage name its text extraction is timed under.
+BACKENDS = {
+    "pypdf": "pdf_text_pypdf",
+    "pdfplumber_text": "pdf_text_pdfplumber",
+    "pdfplumber_tables": "pdf_tables"
+}
 
-def extract_text_from_pdf(file_bytes):
 
-    text_blocks = []
+def open_source(source):
+    # Parsers take either the document bytes or the path of a spooled upload;
+    # a path is read straight from disk instead of being copied into memory.
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    return BytesIO(source)
+
 
-    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
+def page_text(page, tables=True):
 
-            if tables:
-                for table in tables:
-                    for row in table:
-                        if row:
-                            cleaned = [cell.strip() for cell in row if cell]
-                            text_blocks.append(" ".join(cleaned))
+    text_blocks = []
+    page_tables = page.extract_tables() if tables else []
 
-            else:
-                page_text = page.extract_text()
-                if page_text:
-                    text_blocks.append(page_text)
+    if page_tables:
+        for table in page_tables:
+            for row in table:
+                if row:
+                    cleaned = [cell.strip() for cell in row if cell]
+                    text_blocks.append(" ".join(cleaned))
+
+    else:
+        raw_text = page.extract_text()
+        if raw_text:
+            text_blocks.append(raw_text)
 
     return "\n".join(text_blocks)
+
+
+def iter_page_text(source, tables=True, max_pages=PDF_PAGE_BUDGET):
+
+    # Imported on first use: pdfplumber (and pdfminer) are only needed by the
+    # parse workers, not by the API process or the scoring-only app.
+    import pdfplumber
+
+    with open_source(source) as stream, pdfplumber.open(stream) as pdf:
+        for index, page in enumerate(pdf.pages):
+            if max_pages and index >= max_pages:
+                break
+            yield page_text(page, tables)
+            page.close()
+
+
+def extract_text_from_pdf(source):
+
+    blocks = [text for text in iter_page_text(source, max_pages=None) if text]
+
+    return "\n".join(blocks)
+
+
+def _pypdf_pages(stream, max_pages):
+    from PyPDF2 import PdfReader
+
+    try:
+        reader = PdfReader(stream)
+        pages = reader.pages[:max_pages] if max_pages else reader.pages
+    except Exception:
+        return None
+
+    def text(page):
+        try:
+            return page.extract_text() or ""
+        except Exception:
+            return ""
+
+    return [(page, text) for page in pages]
+
+
+def _pdfplumber_pages(pdf, max_pages, tables):
+    pages = pdf.pages[:max_pages] if max_pages else pdf.pages
+    return [(page, lambda page: page_text(page, tables)) for page in pages]
+
+
+class _Scan:
+
+    # Accumulates matches page by page. A page is worth handing to the next
+    # backend only if its text layer came back empty, or it names a marker
+    # that is still missing (label found, value not parsed). Pages that simply
+    # do not mention the missing markers are never re-extracted.
+
+    def __init__(self, table, separator):
+        self.table = table
+        self.separator = separator
+        self.found = {}
+        self.text_seconds = 0.0
+        self.scan_seconds = 0.0
+
+    def run(self, pages, indices, carry_over):
+        mentioned = {}
+        carry = ""
+
+        for index in indices:
+            page, extract = pages[index]
+            start = time.perf_counter()
+            text = extract(page)
+            self.text_seconds += time.perf_counter() - start
+
+            if not text or not text.strip():
+                mentioned[index] = None
+                continue
+
+            start = time.perf_counter()
+            text = carry + text + self.separator
+            self.found = self.table.scan(text, self.found)
+            mentioned[index] = self.table.mentions(text, self.table.missing(self.found))
+            self.scan_seconds += time.perf_counter() - start
+
+            if self.table.complete(self.found):
+                return []
+            if carry_over:
+                tail = text[:-len(self.separator)] if self.separator else text
+                carry = tail[tail.rfind("\n") + 1:] + self.separator
+
+        missing = self.table.missing(self.found)
+        return [
+            index for index, names in mentioned.items()
+            if names is None or names & missing
+        ]
+
+
+def extract_markers(source, table, separator="\n", max_pages=PDF_PAGE_BUDGET):
+
+    # One pipeline for every marker table, cheapest backend first:
+    #   1. PyPDF2 text layer over every page, carrying the trailing line across
+    #      pages as the page-wise scan always has;
+    #   2. pdfplumber text, only on pages step 1 left unresolved;
+    #   3. pdfplumber tables, only on pages still unresolved after step 2.
+    # It stops as soon as every marker is found. The last backend that had to
+    # run is annotated as "pdf_backend"; each backend is timed separately.
+    scan = _Scan(table, separator)
+    backend = "pypdf"
+
+    with open_source(source) as stream:
+        pages = _pypdf_pages(stream, max_pages)
+        if pages is not None:
+            unmatched = scan.run(pages, range(len(pages)), carry_over=True)
+            add_timing(BACKENDS[backend], scan.text_seconds)
+
+        if pages is None or unmatched:
+            import pdfplumber
+
+            stream.seek(0)
+            with pdfplumber.open(stream) as pdf:
+                if pages is None:
+                    unmatched = range(len(pdf.pages[:max_pages] if max_pages else pdf.pages))
+
+                for backend, tables in (("pdfplumber_text", False), ("pdfplumber_tables", True)):
+                    scan.text_seconds = 0.0
+                    scan.separator = "\n"
+                    unmatched = scan.run(_pdfplumber_pages(pdf, max_pages, tables), unmatched, carry_over=False)
+                    add_timing(BACKENDS[backend], scan.text_seconds)
+                    if not unmatched:
+                        break
+
+    add_timing("regex_extraction", scan.scan_seconds)
+    annotate("pdf_backend", backend)
+
+    return {name: scan.found.get(name) for name in table.markers}
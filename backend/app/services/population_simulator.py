@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.config import POPULATION_MEMORY_BUDGET_MB, POPULATION_WORKERS
+from app.services.risk_engine import calculate_risk_engine_batch, BATCH_BIOMARKERS
+
+# Expected change per year, in each marker's own units (BATCH_BIOMARKERS order).
+DEFAULT_DRIFT = np.array([1.5, 2.0, -0.2, 0.5, 0.3, 0.05, 0.03, -0.2])
+
+DEFAULT_YEARLY_STD = np.array([8.0, 20.0, 3.0, 8.0, 5.0, 0.5, 0.1, 4.0])
+
+DEFAULT_CORRELATION = np.array([
+    # ldl   tg    hdl   alt   ast   crp   a1c   vitd
+    [1.0,  0.4, -0.2,  0.1,  0.1,  0.2,  0.2,  0.0],
+    [0.4,  1.0, -0.4,  0.2,  0.1,  0.2,  0.3,  0.0],
+    [-0.2, -0.4, 1.0, -0.1,  0.0, -0.2, -0.2,  0.1],
+    [0.1,  0.2, -0.1,  1.0,  0.7,  0.2,  0.1,  0.0],
+    [0.1,  0.1,  0.0,  0.7,  1.0,  0.2,  0.1,  0.0],
+    [0.2,  0.2, -0.2,  0.2,  0.2,  1.0,  0.2, -0.1],
+    [0.2,  0.3, -0.2,  0.1,  0.1,  0.2,  1.0,  0.0],
+    [0.0,  0.0,  0.1,  0.0,  0.0, -0.1,  0.0,  1.0],
+])
+
+DEFAULT_COVARIANCE = DEFAULT_CORRELATION * np.outer(DEFAULT_YEARLY_STD, DEFAULT_YEARLY_STD)
+
+PERCENTILES = [10, 50, 90]
+
+# Rough working set of one simulated path inside the batch scorer.
+BYTES_PER_PATH = len(BATCH_BIOMARKERS) * 8 * 40
+
+
+def chunk_size(paths, memory_budget_mb=POPULATION_MEMORY_BUDGET_MB):
+    return max(1, int(memory_budget_mb * 1024 * 1024 // (paths * BYTES_PER_PATH)))
+
+
+def _simulate_chunk(values, paths, horizons, drift, covariance, seed):
+    # values: (patients, markers) with NaN for unmeasured markers, which stay
+    # unmeasured. Increments between horizons are drawn as the sum of the
+    # yearly drifts, i.e. N(gap * drift, gap * covariance).
+    rng = np.random.default_rng(seed)
+    factor = np.linalg.cholesky(covariance)
+    patients, markers = values.shape
+
+    state = np.repeat(values[:, None, :], paths, axis=1)
+    previous = 0
+    scores = []
+
+    for horizon in horizons:
+        gap = horizon - previous
+        noise = rng.standard_normal((patients, paths, markers)) @ factor.T
+        state = np.maximum(state + gap * drift + np.sqrt(gap) * noise, 0)
+        previous = horizon
+
+        batch = calculate_risk_engine_batch({
+            name: state[:, :, i].ravel() for i, name in enumerate(BATCH_BIOMARKERS)
+        })
+        scores.append(batch["risk_score"].reshape(patients, paths))
+
+    scores = np.stack(scores, axis=1)
+    return {
+        "percentiles": np.percentile(scores, PERCENTILES, axis=2).transpose(1, 2, 0),
+        "mean": scores.mean(axis=2),
+        "histogram": np.stack([
+            np.bincount(scores[:, k].ravel(), minlength=101)
+            for k in range(len(horizons))
+        ])
+    }
+
+
+def _histogram_percentiles(counts, percentiles):
+    cumulative = np.cumsum(counts)
+    targets = np.asarray(percentiles) / 100 * cumulative[-1]
+    return np.searchsorted(cumulative, targets, side="left").tolist()
+
+
+def simulate_population(
+    patients,
+    paths=1000,
+    horizons=(5, 10),
+    drift=None,
+    covariance=None,
+    seed=None,
+    workers=POPULATION_WORKERS,
+    memory_budget_mb=POPULATION_MEMORY_BUDGET_MB
+):
+
+    values = np.array([
+        [np.nan if p.get(name) is None else p[name] for name in BATCH_BIOMARKERS]
+        for p in patients
+    ], dtype=float).reshape(len(patients), len(BATCH_BIOMARKERS))
+    drift = DEFAULT_DRIFT if drift is None else np.asarray(drift, dtype=float)
+    covariance = DEFAULT_COVARIANCE if covariance is None else np.asarray(covariance, dtype=float)
+    horizons = sorted(horizons)
+
+    size = chunk_size(paths, memory_budget_mb)
+    chunks = [values[i:i + size] for i in range(0, len(values), size)]
+    # One child seed per chunk keeps results identical however chunks are scheduled.
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(chunk, paths, horizons, drift, covariance, s) for chunk, s in zip(chunks, seeds)]
+
+    if workers and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*jobs)))
+    else:
+        results = [_simulate_chunk(*job) for job in jobs]
+
+    percentiles = np.concatenate([r["percentiles"] for r in results]) if results else np.empty((0, len(horizons), 3))
+    means = np.concatenate([r["mean"] for r in results]) if results else np.empty((0, len(horizons)))
+    histogram = sum(r["histogram"] for r in results) if results else np.zeros((len(horizons), 101), dtype=int)
+
+    def bands(row, mean):
+        return {
+            f"{horizon}_year": {
+                "mean": round(float(mean[k]), 1),
+                **{f"p{p}": round(float(row[k, j]), 1) for j, p in enumerate(PERCENTILES)}
+            }
+            for k, horizon in enumerate(horizons)
+        }
+
+    return {
+        "paths": paths,
+        "horizons": horizons,
+        "chunks": len(chunks),
+        "patients": [bands(percentiles[i], means[i]) for i in range(len(values))],
+        "cohort": {
+            f"{horizon}_year": {
+                "mean": round(float(np.dot(np.arange(101), histogram[k]) / max(histogram[k].sum(), 1)), 1),
+                **dict(zip(
+                    (f"p{p}" for p in PERCENTILES),
+                    _histogram_percentiles(histogram[k], PERCENTILES)
+                ))
+            }
+            for k, horizon in enumerate(horizons)
+        }
+    }
@@ -0,0 +1,182 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from app.services.risk_engine import (
+    resolve_model,
+    _column,
+    _batch_size,
+    behavioral_index_batch,
+    marker_values_batch,
+    domain_indices_batch,
+    severity_batch,
+    risk_composite_batch
+)
+
+# Coalition columns evaluated per vectorized pass; patients are chunked so a
+# pass stays under this (256 coalitions x 1024 patients for eight markers).
+MAX_COALITION_COLUMNS = 1 << 18
+
+
+@lru_cache(maxsize=None)
+def shapley_matrix(players):
+    # W such that W @ v gives exact Shapley values, where v[S] is the value of
+    # coalition S (bit i set = player i present) for all 2^n coalitions:
+    #   phi_i = sum over S without i of |S|!(n-|S|-1)!/n! * (v(S+i) - v(S))
+    masks = np.arange(1 << players)
+    members = (masks[None, :] >> np.arange(players)[:, None]) & 1
+    size = members.sum(axis=0)
+    weight = lambda k: math.factorial(k) * math.factorial(players - k - 1) / math.factorial(players)
+    with_i = np.array([weight(k - 1) if k else 0.0 for k in range(players + 1)])
+    without_i = np.array([weight(k) if k < players else 0.0 for k in range(players + 1)])
+    return members, np.where(members == 1, with_i[size][None, :], -without_i[size][None, :])
+
+
+def reference_markers(model):
+    # Healthy reference patient: every marker at the end of its range that
+    # normalizes to zero risk. Absent players take these values.
+    healthy = np.where(model.marker_invert, model.marker_high, model.marker_low)
+    return np.where(np.isnan(model.marker_reflect), healthy, model.marker_reflect - healthy)
+
+
+def _apply(weights, v):
+    # einsum rather than @: BLAS may sum in a different order depending on
+    # how many rows are in the chunk, and a patient's attributions should not
+    # depend on which batch it was scored in.
+    return np.einsum("pc,cr->pr", weights, v)
+
+
+def _chunks(size, coalitions):
+    step = max(1, MAX_COALITION_COLUMNS // coalitions)
+    for start in range(0, size, step):
+        yield slice(start, min(start + step, size))
+
+
+def _marker_game(model, raw, behavioral_values):
+    # v(S) = risk probability (x100) with markers in S at the patient's value
+    # (missing stays missing) and the rest at the healthy reference.
+    players = len(model.markers)
+    members, weights = shapley_matrix(players)
+    coalitions = members.shape[1]
+    rows = raw.shape[1]
+
+    present = members[:, :, None].astype(bool)
+    reference = reference_markers(model)[:, None, None]
+    columns = np.where(present, raw[:, None, :], reference).reshape(players, coalitions * rows)
+
+    values = marker_values_batch(model, columns)
+    probability, _ = risk_composite_batch(
+        model,
+        values,
+        domain_indices_batch(model, values, np.repeat(behavioral_values[None, :], coalitions, axis=0).ravel()),
+        severity_batch(model, columns),
+        np.isnan(values).sum(axis=0)
+    )
+    v = probability.reshape(coalitions, rows) * 100
+    return v[0], _apply(weights, v)
+
+
+def _domain_game(model, values, indices, severity, missing_count):
+    # v(S) = risk probability (x100) with domain indices in S at the patient's
+    # value and the rest at 0; marker-level synergy conditions, severity
+    # bumps and the missing-data penalty stay as the patient has them.
+    players = len(model.domains)
+    members, weights = shapley_matrix(players)
+    coalitions = members.shape[1]
+    rows = len(severity)
+
+    tile = lambda array: np.tile(array, coalitions)
+    probability, _ = risk_composite_batch(
+        model,
+        np.tile(values, (1, coalitions)),
+        {
+            name: np.where(members[i][:, None] == 1, indices[name][None, :], 0.0).ravel()
+            for i, name in enumerate(model.domains)
+        },
+        tile(severity),
+        tile(missing_count)
+    )
+    v = probability.reshape(coalitions, rows) * 100
+    return v[0], _apply(weights, v)
+
+
+def risk_attribution_batch(biomarkers, behavioral=None, model=None):
+
+    # Exact Shapley attributions of the (unrounded) risk score, per biomarker
+    # and per domain. For every row:
+    #   biomarker_base + sum(biomarkers) == domain_base + sum(domains) == score
+    # risk_score is round(score). Rows are scored in chunks, each chunk's
+    # coalitions in a single vectorized pass.
+    model = resolve_model(model)
+    size = _batch_size(biomarkers, behavioral)
+
+    raw = np.stack([_column(biomarkers, name, size) for name in model.markers])
+    behavioral_values = behavioral_index_batch(behavioral, size, model)
+
+    values = marker_values_batch(model, raw)
+    indices = domain_indices_batch(model, values, behavioral_values)
+    severity = severity_batch(model, raw)
+    missing_count = np.isnan(values).sum(axis=0)
+    probability, _ = risk_composite_batch(model, values, indices, severity, missing_count)
+
+    marker_base = np.zeros(size)
+    marker_phi = np.zeros((len(model.markers), size))
+    domain_base = np.zeros(size)
+    domain_phi = np.zeros((len(model.domains), size))
+
+    for rows in _chunks(size, 1 << len(model.markers)):
+        marker_base[rows], marker_phi[:, rows] = _marker_game(model, raw[:, rows], behavioral_values[rows])
+    for rows in _chunks(size, 1 << len(model.domains)):
+        domain_base[rows], domain_phi[:, rows] = _domain_game(
+            model,
+            values[:, rows],
+            {name: index[rows] for name, index in indices.items()},
+            severity[rows],
+            missing_count[rows]
+        )
+
+    return {
+        "score": probability * 100,
+        "biomarker_base": marker_base,
+        "biomarkers": dict(zip(model.markers, marker_phi)),
+        "domain_base": domain_base,
+        "domains": dict(zip(model.domains, domain_phi))
+    }
+
+
+def attribution_rows(attribution, model=None, ndigits=4):
+
+    model = resolve_model(model)
+    domains = attribution["domains"]
+
+    for i in range(len(attribution["score"])):
+        contributions = {name: round(float(values[i]), ndigits) for name, values in domains.items()}
+        yield {
+            "score": round(float(attribution["score"][i]), ndigits),
+            "biomarker_base": round(float(attribution["biomarker_base"][i]), ndigits),
+            "biomarkers": {
+                name: round(float(values[i]), ndigits)
+                for name, values in attribution["biomarkers"].items()
+            },
+            "domain_base": round(float(attribution["domain_base"][i]), ndigits),
+            "domains": contributions,
+            # Domains ranked by what they add to the score, not by raw index.
+            "drivers": [
+                name for name in sorted(contributions, key=contributions.get, reverse=True)
+                if contributions[name] > 0
+            ][:model.priority_count]
+        }
+
+
+def risk_attribution(biomarkers, behavioral=None, model=None):
+    model = resolve_model(model)
+    attribution = risk_attribution_batch(
+        {name: [np.nan if biomarkers.get(name) is None else biomarkers[name]] for name in model.markers},
+        {
+            name: [np.nan if behavioral.get(name) is None else behavioral[name]]
+            for name, _, _, _ in model.behavioral_factors
+        } if behavioral else None,
+        model
+    )
+    return next(attribution_rows(attribution, model))
@@ -1,4 +1,6 @@
 import math
+import numpy as np
+from app.services.risk_model import get_model
 
 
 def clamp(x, low=0, high=1):
@@ -15,177 +17,368 @@ def sigmoid(x):
     return 1 / (1 + math.exp(-x))
 
 
-def behavioral_index(behavioral):
+def marker_norm(value, low, high, reflect=None, invert=False):
+    if value is None:
+        return None
+    normalized = norm(value if reflect is None else reflect - value, low, high)
+    return 1 - normalized if invert else normalized
+
+
+def behavioral_index(behavioral, model=None):
+    model = model or get_model()
+
     if not behavioral:
-        return 0.2
-
-    sleep = behavioral.get("sleep_hours")
-    stress = behavioral.get("stress_level")
-    exercise = behavioral.get("exercise_days")
-    alcohol = behavioral.get("alcohol_frequency")
-
-    sleep_penalty = clamp((7 - sleep) / 4, 0, 1) if sleep is not None else 0.2
-    stress_penalty = clamp((stress - 4) / 6, 0, 1) if stress is not None else 0.2
-    inactivity_penalty = clamp((3 - exercise) / 3, 0, 1) if exercise is not None else 0.2
-    alcohol_penalty = clamp(alcohol / 5, 0, 1) if alcohol is not None else 0.2
-
-    return (
-        sleep_penalty * 0.3 +
-        stress_penalty * 0.3 +
-        inactivity_penalty * 0.2 +
-        alcohol_penalty * 0.2
-    )
+        return model.behavioral_default
+
+    index = 0
+    for name, pivot, scale, weight in model.behavioral_factors:
+        value = behavioral.get(name)
+        penalty = clamp((value - pivot) / scale, 0, 1) if value is not None else model.behavioral_missing
+        index += penalty * weight
+    return index
 
 
-def safe_weighted_average(values, weights):
+def safe_weighted_average(values, weights, default=0.2):
     total = 0
     weight_sum = 0
     for v, w in zip(values, weights):
         if v is not None:
             total += v * w
             weight_sum += w
-    return total / weight_sum if weight_sum else 0.2
-
-
-def calculate_risk_engine(biomarkers, demographics=None, behavioral=None):
-
-    ldl = biomarkers.get("ldl")
-    tg = biomarkers.get("triglycerides")
-    hdl = biomarkers.get("hdl")
-    alt = biomarkers.get("alt")
-    ast = biomarkers.get("ast")
-    crp = biomarkers.get("hs_crp")
-    hba1c = biomarkers.get("hba1c")
-    vitd = biomarkers.get("vitamin_d")
-
-    ldl_norm = norm(ldl, 100, 190)
-    tg_norm = norm(tg, 150, 400)
-    hdl_inv = 1 - norm(hdl, 40, 70) if hdl is not None else None
-    alt_norm = norm(alt, 40, 300)
-    ast_norm = norm(ast, 40, 200)
-    crp_norm = norm(crp, 1, 8)
-    hba1c_norm = norm(hba1c, 5.7, 8.5)
-    vitd_def = norm(30 - vitd, 0, 30) if vitd is not None else None
-
-    cardio_index = safe_weighted_average(
-        [ldl_norm, tg_norm, hdl_inv, crp_norm],
-        [0.35, 0.25, 0.2, 0.2]
-    )
+    return total / weight_sum if weight_sum else default
 
-    liver_index = safe_weighted_average(
-        [alt_norm, ast_norm],
-        [0.6, 0.4]
-    )
 
-    metabolic_index = hba1c_norm if hba1c_norm is not None else 0.2
-    inflammatory_index = crp_norm if crp_norm is not None else 0.2
-    nutritional_index = vitd_def if vitd_def is not None else 0.2
-    behavior_index = behavioral_index(behavioral)
+def resolve_model(model=None):
+    return model if model is not None and not isinstance(model, str) else get_model(model)
 
-    synergy = 1.0
 
-    if cardio_index > 0.5 and inflammatory_index > 0.5:
-        synergy += 0.15
+# Scoring stages. calculate_risk_engine runs them all; score_graph.RiskGraph
+# reruns only the ones downstream of changed inputs. Each stage takes an
+# optional subset of names to evaluate.
 
-    if liver_index > 0.5 and behavior_index > 0.4:
-        synergy += 0.12
+def marker_norms(model, biomarkers, names=None):
+    return {
+        name: marker_norm(biomarkers.get(name), low, high, reflect, invert)
+        for name, low, high, reflect, invert in model.marker_rules
+        if names is None or name in names
+    }
 
-    if metabolic_index > 0.4 and tg_norm is not None and tg_norm > 0.4:
-        synergy += 0.1
+
+def domain_indices(model, norms, behavioral, names=None):
+    indices = {}
+    for name, inputs, is_behavioral, _ in model.domain_rules:
+        if names is not None and name not in names:
+            continue
+        if is_behavioral:
+            indices[name] = behavioral_index(behavioral, model)
+        else:
+            indices[name] = safe_weighted_average(
+                [norms[marker] for marker, _ in inputs],
+                [weight for _, weight in inputs],
+                model.default_index
+            )
+    return indices
+
+
+def synergy_terms(model, indices, norms, rules=None):
+    # One entry per synergy rule: its bonus when the rule fires, else 0.
+    terms = {}
+    for i, (conditions, bonus) in enumerate(model.synergy_rules):
+        if rules is not None and i not in rules:
+            continue
+        met = all(
+            indices[key] > threshold if kind == "domain"
+            else norms[key] is not None and norms[key] > threshold
+            for kind, key, threshold in conditions
+        )
+        terms[i] = bonus if met else 0
+    return terms
+
+
+def severity_terms(model, biomarkers, rules=None):
+    terms = {}
+    for i, (marker, threshold, bonus) in enumerate(model.severity_rules):
+        if rules is not None and i not in rules:
+            continue
+        value = biomarkers.get(marker)
+        terms[i] = bonus if value is not None and value > threshold else 0
+    return terms
+
+
+def risk_composite(model, norms, indices, synergy_bonus, severity_bonus):
+    # Pre-clamp composite, accumulated in the same order as the batch scorer.
+    synergy = 1.0
+    for i in range(len(model.synergy_rules)):
+        if synergy_bonus[i]:
+            synergy += synergy_bonus[i]
 
     severity = 0
-    if alt is not None and alt > 250:
-        severity += 0.15
-    if ldl is not None and ldl > 180:
-        severity += 0.12
-    if crp is not None and crp > 5:
-        severity += 0.1
-
-    composite = (
-        cardio_index * 0.25 +
-        liver_index * 0.22 +
-        metabolic_index * 0.13 +
-        inflammatory_index * 0.1 +
-        nutritional_index * 0.1 +
-        behavior_index * 0.2
-    )
+    for i in range(len(model.severity_rules)):
+        if severity_bonus[i]:
+            severity += severity_bonus[i]
+
+    composite = 0
+    for name, _, _, weight in model.domain_rules:
+        composite += indices[name] * weight
 
     composite = composite * synergy + severity
 
-    values = [
-        ldl_norm, tg_norm, hdl_inv,
-        alt_norm, ast_norm,
-        crp_norm, hba1c_norm,
-        vitd_def
-    ]
+    missing_count = len([v for v in norms.values() if v is None])
+    composite += missing_count * model.missing_penalty
+
+    return composite, synergy, severity, missing_count
+
 
-    missing_count = len([v for v in values if v is None])
-    composite += missing_count * 0.02
+def assemble_risk(model, norms, indices, synergy_bonus, severity_bonus):
+
+    composite, _, _, missing_count = risk_composite(model, norms, indices, synergy_bonus, severity_bonus)
 
     composite = clamp(composite)
 
-    probability_curve = sigmoid((composite - 0.35) * 7)
+    probability_curve = sigmoid((composite - model.sigmoid_center) * model.sigmoid_slope)
     risk_score = round(probability_curve * 100)
 
-    if risk_score < 30:
-        level = "Low Risk"
-    elif risk_score < 60:
-        level = "Moderate Risk"
-    elif risk_score < 80:
-        level = "High Risk"
-    else:
-        level = "Critical Risk"
-
-    five_year = round(clamp(risk_score * 0.8, 0, 99), 1)
-    ten_year = round(clamp(risk_score * 1.25, 0, 99), 1)
-
-    if risk_score > 65:
-        trajectory = "Accelerating"
-    elif risk_score > 45:
-        trajectory = "Elevated but reversible"
-    else:
-        trajectory = "Stable"
-
-    risk_vector = {
-        "cardio_index": round(cardio_index, 2),
-        "liver_index": round(liver_index, 2),
-        "metabolic_index": round(metabolic_index, 2),
-        "inflammatory_index": round(inflammatory_index, 2),
-        "nutritional_index": round(nutritional_index, 2),
-        "behavioral_index": round(behavior_index, 2)
-    }
+    risk_vector = {name: round(value, 2) for name, value in indices.items()}
 
     priorities = sorted(
         risk_vector.items(),
         key=lambda x: x[1],
         reverse=True
-    )[:2]
+    )[:model.priority_count]
 
     priority_domains = [p[0] for p in priorities]
 
-    total_fields = len(values)
-    filled = total_fields - missing_count
-    completeness = round(filled / total_fields, 2)
-    confidence = round(0.5 + completeness * 0.45, 2)
+    completeness = model.completeness(len(norms) - missing_count)
 
     return {
-        "model_type": "Temporal synergy-weighted preventive intelligence engine",
+        "model_type": model.model_type,
+        "model_version": model.version,
         "risk_score": risk_score,
-        "risk_level": level,
+        "risk_level": model.level(risk_score),
         "risk_vector": risk_vector,
         "risk_priorities": priority_domains,
-        "risk_trajectory": trajectory,
+        "risk_trajectory": model.trajectory(risk_score),
         "event_probability_projection": {
-            "5_year_risk_percent": five_year,
-            "10_year_risk_percent": ten_year
+            key: model.projection(risk_score, factor)
+            for key, factor in model.projections.items()
         },
         "risk_uncertainty": {
             "data_completeness": completeness,
-            "model_confidence": confidence
+            "model_confidence": model.confidence(completeness)
         },
-        "model_explainability": {
-            "methodology": "Synergy-amplified severity-escalated multi-domain model with temporal projection",
-            "calibration_status": "Heuristic interaction model (non-clinical)",
-            "intended_use": "Preventive awareness support only"
+        "model_explainability": dict(model.explainability)
+    }
+
+
+def calculate_risk_engine(biomarkers, demographics=None, behavioral=None, model=None):
+
+    model = resolve_model(model)
+
+    norms = marker_norms(model, biomarkers)
+    indices = domain_indices(model, norms, behavioral)
+
+    return assemble_risk(
+        model,
+        norms,
+        indices,
+        synergy_terms(model, indices, norms),
+        severity_terms(model, biomarkers)
+    )
+
+
+# Every loaded synergy version shares these (risk_model.load_models refuses
+# one that does not), so they hold for whichever version is active.
+_DEFAULT_MODEL = get_model()
+
+BATCH_BIOMARKERS = list(_DEFAULT_MODEL.markers)
+
+BATCH_BEHAVIORAL = [name for name, _, _, _ in _DEFAULT_MODEL.behavioral_factors]
+
+RISK_DOMAINS = list(_DEFAULT_MODEL.domains)
+
+
+def _column(columns, key, size):
+    if not columns or columns.get(key) is None:
+        return np.full(size, np.nan)
+    return np.asarray(columns[key], dtype=float)
+
+
+def _batch_size(*groups):
+    for columns in groups:
+        for values in (columns or {}).values():
+            if values is not None:
+                return len(values)
+    return 0
+
+
+def norm_batch(values, low, high):
+    return np.clip((values - low) / (high - low), 0, 1)
+
+
+def round_batch(values, ndigits):
+    # np.round scales before rounding, which disagrees with Python's round()
+    # on values that sit next to a .5 boundary; redo only those scalarly.
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded.flat[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+
+def behavioral_index_batch(behavioral, size, model=None):
+    model = model or get_model()
+
+    if not behavioral:
+        return np.full(size, model.behavioral_default)
+
+    index = np.zeros(size)
+    for name, pivot, scale, weight in model.behavioral_factors:
+        value = _column(behavioral, name, size)
+        penalty = np.where(
+            np.isnan(value),
+            model.behavioral_missing,
+            np.clip((value - pivot) / scale, 0, 1)
+        )
+        index = index + penalty * weight
+    return index
+
+
+def safe_weighted_average_batch(values, weights, default=0.2):
+    total = np.zeros(len(values[0]))
+    weight_sum = np.zeros(len(values[0]))
+    for v, w in zip(values, weights):
+        present = ~np.isnan(v)
+        total = total + np.where(present, v * w, 0.0)
+        weight_sum = weight_sum + np.where(present, w, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight_sum > 0, total / weight_sum, default)
+
+
+# Batch stages, the vectorized counterparts of the ones above. Arrays are
+# (markers, rows) and (rows,); risk_attribution evaluates them on coalitions.
+
+def marker_values_batch(model, raw):
+    reflected = np.where(np.isnan(model.marker_reflect)[:, None], raw, model.marker_reflect[:, None] - raw)
+    normalized = norm_batch(reflected, model.marker_low[:, None], model.marker_high[:, None])
+    return np.where(model.marker_invert[:, None], 1 - normalized, normalized)
+
+
+def domain_indices_batch(model, values, behavioral_values):
+    norms = dict(zip(model.markers, values))
+    indices = {}
+    for name, inputs, is_behavioral, _ in model.domain_rules:
+        if is_behavioral:
+            indices[name] = behavioral_values
+        else:
+            indices[name] = safe_weighted_average_batch(
+                [norms[marker] for marker, _ in inputs],
+                [weight for _, weight in inputs],
+                model.default_index
+            )
+    return indices
+
+
+def severity_batch(model, raw):
+    severity = np.zeros(raw.shape[1])
+    for marker, threshold, bonus in model.severity_rules:
+        severity = severity + np.where(raw[model.markers.index(marker)] > threshold, bonus, 0.0)
+    return severity
+
+
+def risk_composite_batch(model, values, indices, severity, missing_count):
+    # Returns (probability, unclamped composite).
+    norms = dict(zip(model.markers, values))
+    size = len(severity)
+
+    synergy = np.full(size, 1.0)
+    for conditions, bonus in model.synergy_rules:
+        met = np.ones(size, dtype=bool)
+        for kind, key, threshold in conditions:
+            met &= (indices[key] if kind == "domain" else norms[key]) > threshold
+        synergy = synergy + np.where(met, bonus, 0.0)
+
+    composite = np.zeros(size)
+    for name, _, _, weight in model.domain_rules:
+        composite = composite + indices[name] * weight
+
+    composite = composite * synergy + severity
+    composite = composite + missing_count * model.missing_penalty
+    raw_composite = composite
+
+    composite = np.clip(composite, 0, 1)
+
+    probability = 1 / (1 + np.exp(-((composite - model.sigmoid_center) * model.sigmoid_slope)))
+    return probability, raw_composite
+
+
+def calculate_risk_engine_batch(biomarkers, demographics=None, behavioral=None, model=None):
+
+    model = resolve_model(model)
+    size = _batch_size(biomarkers, behavioral)
+
+    raw = np.stack([_column(biomarkers, name, size) for name in model.markers])
+    values = marker_values_batch(model, raw)
+    indices = domain_indices_batch(model, values, behavioral_index_batch(behavioral, size, model))
+    missing_count = np.isnan(values).sum(axis=0)
+
+    probability_curve, raw_composite = risk_composite_batch(
+        model, values, indices, severity_batch(model, raw), missing_count
+    )
+    risk_score = np.round(probability_curve * 100).astype(int)
+
+    vector = round_batch(np.stack(list(indices.values()), axis=1), 2)
+
+    # Stable sort on the negated vector keeps dict order for ties, as sorted() does.
+    order = np.argsort(-vector, axis=1, kind="stable")[:, :model.priority_count]
+    priorities = np.asarray(model.domains)[order]
+
+    filled = values.shape[0] - missing_count
+
+    return {
+        "model_type": model.model_type,
+        "model_version": model.version,
+        "risk_score": risk_score,
+        "risk_composite": raw_composite,
+        "risk_level": model.score_levels[risk_score],
+        "risk_vector": {
+            name: vector[:, i] for i, name in enumerate(model.domains)
+        },
+        "risk_priorities": priorities,
+        "risk_trajectory": model.score_trajectories[risk_score],
+        "event_probability_projection": {
+            key: table[risk_score] for key, table in model.score_projections.items()
+        },
+        "risk_uncertainty": {
+            "data_completeness": model.fill_completeness[filled],
+            "model_confidence": model.fill_confidence[filled]
+        },
+        "model_explainability": dict(model.explainability)
+    }
+
+
+def batch_result_rows(batch):
+
+    vector = batch["risk_vector"]
+    projection = batch["event_probability_projection"]
+    uncertainty = batch["risk_uncertainty"]
+
+    for i in range(len(batch["risk_score"])):
+        yield {
+            "model_type": batch["model_type"],
+            "model_version": batch["model_version"],
+            "risk_score": int(batch["risk_score"][i]),
+            "risk_level": str(batch["risk_level"][i]),
+            "risk_vector": {
+                name: float(values[i]) for name, values in vector.items()
+            },
+            "risk_priorities": [str(p) for p in batch["risk_priorities"][i]],
+            "risk_trajectory": str(batch["risk_trajectory"][i]),
+            "event_probability_projection": {
+                key: float(values[i]) for key, values in projection.items()
+            },
+            "risk_uncertainty": {
+                key: float(values[i]) for key, values in uncertainty.items()
+            },
+            "model_explainability": dict(batch["model_explainability"])
         }
-    }
\ No newline at end of file
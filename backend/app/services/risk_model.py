@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.config import RISK_MODEL_DIR
+
+
+def _clamp(x, low=0, high=1):
+    return max(low, min(high, x))
+
+
+class SynergyModel:
+
+    # Compiled form of a "synergy" spec: the rule lists used by the scalar
+    # scorer plus coefficient arrays and lookup tables for the batch scorer.
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.version = spec["version"]
+        self.engine = spec["engine"]
+        self.model_type = spec["model_type"]
+        self.explainability = spec["explainability"]
+
+        self.markers = list(spec["markers"])
+        self.marker_low = np.array([m["low"] for m in spec["markers"].values()], dtype=float)
+        self.marker_high = np.array([m["high"] for m in spec["markers"].values()], dtype=float)
+        self.marker_invert = np.array([bool(m.get("invert")) for m in spec["markers"].values()])
+        self.marker_reflect = np.array([
+            np.nan if m.get("reflect") is None else m["reflect"]
+            for m in spec["markers"].values()
+        ], dtype=float)
+        self.marker_rules = [
+            (name, m["low"], m["high"], m.get("reflect"), bool(m.get("invert")))
+            for name, m in spec["markers"].items()
+        ]
+
+        behavioral = spec["behavioral"]
+        self.behavioral_default = behavioral["default_index"]
+        self.behavioral_missing = behavioral["missing_penalty"]
+        self.behavioral_factors = [
+            (name, f["pivot"], f["scale"], f["weight"])
+            for name, f in behavioral["factors"].items()
+        ]
+
+        self.default_index = spec["default_index"]
+        self.domains = list(spec["domains"])
+        self.domain_rules = [
+            (
+                name,
+                list(d.get("inputs", {}).items()),
+                bool(d.get("behavioral")),
+                d["weight"]
+            )
+            for name, d in spec["domains"].items()
+        ]
+
+        self.synergy_rules = [
+            (
+                [
+                    ("domain", c["domain"], c["above"]) if "domain" in c
+                    else ("marker", c["marker"], c["above"])
+                    for c in rule["when"]
+                ],
+                rule["bonus"]
+            )
+            for rule in spec["synergy"]
+        ]
+        self.severity_rules = [
+            (rule["marker"], rule["above"], rule["bonus"])
+            for rule in spec["severity"]
+        ]
+
+        # Dependency edges used for incremental re-scoring: which domains read
+        # each marker, and which markers/domains each synergy rule reads.
+        self.marker_domains = {name: [] for name in self.markers}
+        for name, inputs, _, _ in self.domain_rules:
+            for marker, _ in inputs:
+                self.marker_domains[marker].append(name)
+        self.behavioral_domains = [name for name, _, is_behavioral, _ in self.domain_rules if is_behavioral]
+        self.synergy_inputs = [
+            {(kind, key) for kind, key, _ in conditions}
+            for conditions, _ in self.synergy_rules
+        ]
+
+        self.missing_penalty = spec["missing_penalty"]
+        self.sigmoid_center = spec["sigmoid"]["center"]
+        self.sigmoid_slope = spec["sigmoid"]["slope"]
+
+        self.level_rules = [(rule.get("below"), rule["label"]) for rule in spec["levels"]]
+        self.trajectory_rules = [(rule.get("above"), rule["label"]) for rule in spec["trajectory"]]
+
+        projections = dict(spec["projections"])
+        self.projection_cap = projections.pop("cap")
+        self.projections = projections
+        self.confidence_base = spec["confidence"]["base"]
+        self.confidence_scale = spec["confidence"]["scale"]
+        self.priority_count = spec["priorities"]
+
+        self.clinical_findings = spec.get("clinical_findings", [])
+        self.intervention_plan = spec.get("intervention_plan", [])
+
+        # Scores are integers 0-100 and fill counts 0-len(markers), so every
+        # output derived from them is tabulated once with the scalar rounding.
+        scores = range(101)
+        self.score_levels = np.array([self.level(s) for s in scores])
+        self.score_trajectories = np.array([self.trajectory(s) for s in scores])
+        self.score_projections = {
+            key: np.array([self.projection(s, factor) for s in scores])
+            for key, factor in self.projections.items()
+        }
+        fills = range(len(self.markers) + 1)
+        self.fill_completeness = np.array([self.completeness(f) for f in fills])
+        self.fill_confidence = np.array([self.confidence(c) for c in self.fill_completeness])
+
+    def level(self, score):
+        for below, label in self.level_rules:
+            if below is None or score < below:
+                return label
+
+    def trajectory(self, score):
+        for above, label in self.trajectory_rules:
+            if above is None or score > above:
+                return label
+
+    def projection(self, score, factor):
+        return round(_clamp(score * factor, 0, self.projection_cap), 1)
+
+    def completeness(self, filled):
+        return round(filled / len(self.markers), 2)
+
+    def confidence(self, completeness):
+        return round(self.confidence_base + completeness * self.confidence_scale, 2)
+
+    def schema(self):
+        # What stored data is laid out by: cohort and trend columns, batch
+        # column order and the population drift vectors all follow these.
+        return (
+            tuple(self.markers),
+            tuple(self.domains),
+            tuple(name for name, _, _, _ in self.behavioral_factors)
+        )
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "engine": self.engine,
+            "markers": self.markers,
+            "domains": self.domains
+        }
+
+
+class PreventiveModel:
+
+    # Constants behind main.compute / main.compute_batch.
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.version = spec["version"]
+        self.engine = spec["engine"]
+        self.domains = spec["domains"]
+        self.domain_inputs = {
+            name: set(d.get("inputs", d.get("deficiency", {})))
+            or {"stress_level", "sleep_hours"}
+            for name, d in self.domains.items()
+        }
+        self.override_floor = spec["override"]["floor"]
+        self.override_rules = [
+            (rule["marker"], rule.get("above"), rule.get("at_least"))
+            for rule in spec["override"]["rules"]
+        ]
+        self.level_rules = [(rule.get("below"), rule["label"]) for rule in spec["levels"]]
+        self.volatility = spec["volatility"]
+        self.projections = spec["projections"]
+        self.compliance = spec["compliance"]
+        self.economics = spec["economics"]
+
+    def level(self, score):
+        for below, label in self.level_rules:
+            if below is None or score < below:
+                return label
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "engine": self.engine,
+            "domains": list(self.domains)
+        }
+
+
+ENGINES = {
+    "synergy": SynergyModel,
+    "preventive": PreventiveModel
+}
+
+
+def read_spec(path):
+    with open(path) as handle:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(handle)
+        return json.load(handle)
+
+
+def compile_spec(spec):
+    engine = ENGINES.get(spec.get("engine"))
+    if engine is None:
+        raise ValueError(f"Unknown model engine: {spec.get('engine')}")
+    return engine(spec)
+
+
+_lock = threading.Lock()
+_registry = {"models": {}, "active": {}}
+_schema = None
+
+
+def load_models(directory=RISK_MODEL_DIR):
+    # Specs are compiled into a fresh registry that replaces the old one in a
+    # single assignment, so in-flight requests keep the model they started with.
+    models = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith((".json", ".yaml", ".yml")):
+            model = compile_spec(read_spec(os.path.join(directory, filename)))
+            models[model.version] = model
+
+    with _lock:
+        global _registry, _schema
+        active = {}
+        for engine in ENGINES:
+            previous = _registry["active"].get(engine)
+            defaults = [
+                m.version for m in models.values()
+                if m.engine == engine and m.spec.get("default")
+            ]
+            candidates = [m.version for m in models.values() if m.engine == engine]
+            if previous in models:
+                active[engine] = previous
+            elif defaults or candidates:
+                active[engine] = (defaults or candidates)[0]
+
+        # Synergy versions can differ in weights, rules and thresholds but not
+        # in markers, domains or behavioral factors: those are fixed by the
+        # first load for the life of the process. A spec that changes them is
+        # refused, so it can neither be selected nor activated.
+        reference = _schema
+        if reference is None and "synergy" in active:
+            reference = models[active["synergy"]].schema()
+        changed = sorted(
+            m.version for m in models.values()
+            if m.engine == "synergy" and m.schema() != reference
+        )
+        if changed:
+            raise ValueError(
+                f"{', '.join(changed)} change the marker, domain or behavioral schema; "
+                "that needs a restart with the stored cohort and trend data migrated"
+            )
+        _schema = reference
+        _registry = {"models": models, "active": active}
+
+    return list(models)
+
+
+def get_model(version=None, engine="synergy"):
+    registry = _registry
+    if version is None:
+        version = registry["active"].get(engine)
+    model = registry["models"].get(version)
+    if model is None or model.engine != engine:
+        raise ValueError(f"Unknown {engine} model version: {version}")
+    return model
+
+
+def activate_model(version):
+    with _lock:
+        global _registry
+        model = _registry["models"].get(version)
+        if model is None:
+            raise ValueError(f"Unknown model version: {version}")
+        _registry = {
+            "models": _registry["models"],
+            "active": {**_registry["active"], model.engine: version}
+        }
+    return model
+
+
+def describe_models():
+    registry = _registry
+    return {
+        "active": dict(registry["active"]),
+        "models": [model.describe() for model in registry["models"].values()]
+    }
+
+
+load_models()
@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+
+from app.config import STATE_MAX_SESSIONS
+from app.services.risk_engine import (
+    resolve_model,
+    marker_norms,
+    domain_indices,
+    synergy_terms,
+    severity_terms,
+    risk_composite,
+    assemble_risk
+)
+
+
+class RiskGraph:
+
+    # Scoring as a dependency graph: biomarker -> normalized value -> domain
+    # index -> synergy/severity terms -> composite -> score and projections.
+    # Every intermediate node is kept, so update() only re-evaluates the nodes
+    # downstream of the inputs that changed. Graphs are immutable; update()
+    # returns a new one and leaves the baseline untouched.
+
+    def __init__(self, biomarkers, behavioral=None, model=None, _nodes=None):
+        self.model = resolve_model(model)
+        self.biomarkers = dict(biomarkers)
+        self.behavioral = dict(behavioral) if behavioral else behavioral
+
+        if _nodes is None:
+            norms = marker_norms(self.model, self.biomarkers)
+            indices = domain_indices(self.model, norms, self.behavioral)
+            _nodes = (
+                norms,
+                indices,
+                synergy_terms(self.model, indices, norms),
+                severity_terms(self.model, self.biomarkers)
+            )
+        self.norms, self.indices, self.synergy, self.severity = _nodes
+        self.recomputed = None
+        self._result = None
+
+    def result(self):
+        if self._result is None:
+            self._result = assemble_risk(self.model, self.norms, self.indices, self.synergy, self.severity)
+        return self._result
+
+    def update(self, biomarkers=None, behavioral=None):
+        model = self.model
+        biomarkers = {
+            k: v for k, v in (biomarkers or {}).items()
+            if self.biomarkers.get(k) != v
+        }
+        merged_bio = {**self.biomarkers, **biomarkers}
+
+        merged_behavioral = self.behavioral
+        behavioral_changed = False
+        if behavioral:
+            merged_behavioral = {**(self.behavioral or {}), **behavioral}
+            behavioral_changed = merged_behavioral != (self.behavioral or {})
+
+        markers = {k for k in biomarkers if k in model.marker_domains}
+        domains = {d for m in markers for d in model.marker_domains[m]}
+        if behavioral_changed:
+            domains.update(model.behavioral_domains)
+
+        norms = {**self.norms, **marker_norms(model, merged_bio, markers)}
+        indices = {**self.indices, **domain_indices(model, norms, merged_behavioral, domains)}
+
+        touched = {("marker", m) for m in markers} | {("domain", d) for d in domains}
+        synergy_rules = {i for i, inputs in enumerate(model.synergy_inputs) if inputs & touched}
+        severity_rules = {
+            i for i, (marker, _, _) in enumerate(model.severity_rules)
+            if marker in biomarkers
+        }
+
+        graph = RiskGraph(merged_bio, merged_behavioral, model, _nodes=(
+            norms,
+            indices,
+            {**self.synergy, **synergy_terms(model, indices, norms, synergy_rules)},
+            {**self.severity, **severity_terms(model, merged_bio, severity_rules)}
+        ))
+        graph.recomputed = {
+            "markers": sorted(markers),
+            "domains": [d for d in model.domains if d in domains],
+            "synergy_rules": sorted(synergy_rules),
+            "severity_rules": sorted(severity_rules)
+        }
+        return graph
+
+    def explain(self):
+        # Per-domain share of the pre-clamp composite, read off the cached nodes.
+        composite, synergy, severity, missing = risk_composite(
+            self.model, self.norms, self.indices, self.synergy, self.severity
+        )
+        return {
+            "composite": round(composite, 4),
+            "domains": {
+                name: {
+                    "index": round(self.indices[name], 4),
+                    "weight": weight,
+                    "contribution": round(self.indices[name] * weight * synergy, 4)
+                }
+                for name, _, _, weight in self.model.domain_rules
+            },
+            "synergy_multiplier": round(synergy, 4),
+            "severity": round(severity, 4),
+            "missing_penalty": round(missing * self.model.missing_penalty, 4)
+        }
+
+
+class GraphCache:
+
+    # Baseline graphs per patient, LRU-bounded and local to the process.
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.graphs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            graph = self.graphs.get(key)
+            if graph is not None:
+                self.graphs.move_to_end(key)
+            return graph
+
+    def put(self, key, graph):
+        with self.lock:
+            self.graphs[key] = graph
+            self.graphs.move_to_end(key)
+            while len(self.graphs) > self.max_entries:
+                self.graphs.popitem(last=False)
+
+
+risk_graphs = GraphCache(max_entries=STATE_MAX_SESSIONS)
@@ -0,0 +1,300 @@
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.config import (
+    STATE_BACKEND,
+    STATE_SQLITE_PATH,
+    STATE_TTL_SECONDS,
+    STATE_MAX_SESSIONS,
+    STATE_MAX_BYTES,
+    STATE_HISTORY_SIZE,
+    STATE_PRUNE_SECONDS
+)
+
+# Stored size of a session row, as counted against STATE_MAX_BYTES.
+SESSION_BYTES = "COALESCE(length(baseline), 0) + COALESCE(length(baseline_result), 0) + COALESCE(length(history), 0)"
+
+
+class RingBuffer:
+
+    def __init__(self, capacity, values=None):
+        self.capacity = capacity
+        self.data = array("i", [0]) * capacity
+        self.start = 0
+        self.size = 0
+        for value in values or []:
+            self.append(value)
+
+    def append(self, value):
+        end = (self.start + self.size) % self.capacity
+        self.data[end] = int(value)
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def values(self):
+        return [self.data[(self.start + i) % self.capacity] for i in range(self.size)]
+
+    @property
+    def nbytes(self):
+        return self.data.itemsize * self.capacity
+
+    def to_bytes(self):
+        return array("i", self.values()).tobytes()
+
+    @classmethod
+    def from_bytes(cls, capacity, raw):
+        values = array("i")
+        values.frombytes(raw or b"")
+        return cls(capacity, values)
+
+
+class InMemoryStateStore:
+
+    blocking = False
+
+    def __init__(self, ttl=86400, max_sessions=10000, max_bytes=64 * 1024 * 1024, history_size=256):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.history_size = history_size
+        self.sessions = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _session(self, session_id, create=False):
+        now = time.time()
+        session = self.sessions.get(session_id)
+
+        if session is not None and session["expires"] < now:
+            self._drop(session_id)
+            session = None
+
+        if session is None and create:
+            session = {
+                "baseline": None,
+                "baseline_result": None,
+                "history": RingBuffer(self.history_size),
+                "bytes": 0
+            }
+            self.sessions[session_id] = session
+
+        if session is not None:
+            session["expires"] = now + self.ttl
+            self.sessions.move_to_end(session_id)
+
+        return session
+
+    def _drop(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.total_bytes -= session["bytes"]
+
+    def _resize(self, session_id, session):
+        size = session["history"].nbytes + len(
+            json.dumps([session["baseline"], session["baseline_result"]], default=float)
+        )
+        self.total_bytes += size - session["bytes"]
+        session["bytes"] = size
+
+        while self.sessions and (
+            len(self.sessions) > self.max_sessions or self.total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self.sessions))
+            if oldest == session_id:
+                break
+            self._drop(oldest)
+            self.evictions += 1
+
+    def get_baseline(self, session_id):
+        with self.lock:
+            session = self._session(session_id)
+            if session is None or session["baseline"] is None:
+                return None, None
+            return dict(session["baseline"]), session["baseline_result"]
+
+    def set_baseline(self, session_id, biomarkers, result):
+        with self.lock:
+            session = self._session(session_id, create=True)
+            session["baseline"] = dict(biomarkers)
+            session["baseline_result"] = result
+            self._resize(session_id, session)
+
+    def append_history(self, session_id, score):
+        with self.lock:
+            session = self._session(session_id, create=True)
+            session["history"].append(score)
+            self._resize(session_id, session)
+
+    def history(self, session_id):
+        with self.lock:
+            session = self._session(session_id)
+            return session["history"].values() if session else []
+
+    def stats(self):
+        with self.lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self.sessions),
+                "approx_bytes": self.total_bytes,
+                "evictions": self.evictions
+            }
+
+
+class SQLiteStateStore:
+
+    # Shared by every uvicorn worker that points at the same database file.
+    # Calls can wait on another worker's write lock, so callers on the event
+    # loop run them in the threadpool.
+    blocking = True
+
+    def __init__(self, path, ttl=86400, max_sessions=10000, max_bytes=64 * 1024 * 1024,
+                 history_size=256, prune_interval=60.0):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.history_size = history_size
+        self.prune_interval = prune_interval
+        self.next_prune = 0.0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        # Autocommit mode: read-modify-write updates open their own
+        # BEGIN IMMEDIATE transaction (see _transaction).
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, baseline TEXT, baseline_result TEXT, "
+            "history BLOB, expires REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    @contextmanager
+    def _transaction(self):
+        # The thread lock covers this process; BEGIN IMMEDIATE takes the
+        # database write lock before the read, so another worker cannot
+        # update the same session between our SELECT and INSERT.
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def _row(self, session_id):
+        row = self.db.execute(
+            "SELECT baseline, baseline_result, history FROM sessions "
+            "WHERE session_id = ? AND expires >= ?",
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None, None, RingBuffer(self.history_size)
+        return (
+            json.loads(row[0]) if row[0] else None,
+            json.loads(row[1]) if row[1] else None,
+            RingBuffer.from_bytes(self.history_size, row[2])
+        )
+
+    def _write(self, session_id, baseline, result, history):
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+            (
+                session_id,
+                json.dumps(baseline) if baseline is not None else None,
+                json.dumps(result, default=float) if result is not None else None,
+                history.to_bytes(),
+                now + self.ttl
+            )
+        )
+        if now >= self.next_prune:
+            self.next_prune = now + self.prune_interval
+            self._prune(now)
+
+    def _prune(self, now):
+        # Runs every prune_interval inside a write transaction: expired
+        # sessions, then the least recently used ones while over the session
+        # or byte cap. Cutoffs are read off the expires index.
+        self.db.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+
+        row = self.db.execute(
+            "SELECT expires FROM sessions ORDER BY expires DESC LIMIT 1 OFFSET ?",
+            (self.max_sessions,)
+        ).fetchone()
+        if row is not None:
+            self.evictions += self.db.execute("DELETE FROM sessions WHERE expires <= ?", row).rowcount
+
+        excess = self.db.execute(f"SELECT COALESCE(SUM({SESSION_BYTES}), 0) FROM sessions").fetchone()[0] - self.max_bytes
+        if excess > 0:
+            cutoff = None
+            cursor = self.db.execute(f"SELECT expires, {SESSION_BYTES} FROM sessions ORDER BY expires")
+            for expires, size in cursor:
+                cutoff = expires
+                excess -= size
+                if excess <= 0:
+                    break
+            cursor.close()
+            self.evictions += self.db.execute("DELETE FROM sessions WHERE expires <= ?", (cutoff,)).rowcount
+
+    def get_baseline(self, session_id):
+        with self.lock:
+            baseline, result, _ = self._row(session_id)
+            return baseline, result
+
+    def set_baseline(self, session_id, biomarkers, result):
+        with self._transaction():
+            _, _, history = self._row(session_id)
+            self._write(session_id, dict(biomarkers), result, history)
+
+    def append_history(self, session_id, score):
+        with self._transaction():
+            baseline, result, history = self._row(session_id)
+            history.append(score)
+            self._write(session_id, baseline, result, history)
+
+    def history(self, session_id):
+        with self.lock:
+            return self._row(session_id)[2].values()
+
+    def stats(self):
+        with self.lock:
+            sessions, size = self.db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({SESSION_BYTES}), 0) FROM sessions"
+            ).fetchone()
+            return {
+                "backend": "sqlite",
+                "sessions": sessions,
+                "approx_bytes": size,
+                "evictions": self.evictions
+            }
+
+
+def create_state_store(backend=STATE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteStateStore(
+            STATE_SQLITE_PATH,
+            ttl=STATE_TTL_SECONDS,
+            max_sessions=STATE_MAX_SESSIONS,
+            max_bytes=STATE_MAX_BYTES,
+            history_size=STATE_HISTORY_SIZE,
+            prune_interval=STATE_PRUNE_SECONDS
+        )
+    if backend == "memory":
+        return InMemoryStateStore(
+            ttl=STATE_TTL_SECONDS,
+            max_sessions=STATE_MAX_SESSIONS,
+            max_bytes=STATE_MAX_BYTES,
+            history_size=STATE_HISTORY_SIZE
+        )
+    raise ValueError(f"Unknown state backend: {backend}")
+
+
+state_store = create_state_store()
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import TREND_EWMA_ALPHA, TREND_SLOPE_THRESHOLD, TREND_MAX_PATIENTS
+from app.services.risk_engine import BATCH_BIOMARKERS, RISK_DOMAINS
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+
+class PatientSeries:
+
+    def __init__(self, capacity=16, alpha=0.3):
+        self.alpha = alpha
+        self.size = 0
+        self.timestamps = np.empty(capacity)
+        self.scores = np.empty(capacity)
+        self.vectors = np.empty((capacity, len(RISK_DOMAINS)))
+        self.biomarkers = np.empty((capacity, len(BATCH_BIOMARKERS)))
+        self._reset_aggregates()
+
+    def _reset_aggregates(self):
+        self.origin = None
+        self.ewma = None
+        self.last_score = None
+        self.delta_count = 0
+        self.delta_mean = 0.0
+        self.delta_m2 = 0.0
+        self.sum_t = 0.0
+        self.sum_y = 0.0
+        self.sum_tt = 0.0
+        self.sum_ty = 0.0
+
+    def _grow(self):
+        capacity = len(self.timestamps) * 2
+        for name in ("timestamps", "scores", "vectors", "biomarkers"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:])
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _accumulate(self, timestamp, score):
+        # Running sums for least-squares slope, EWMA level and Welford variance
+        # of score changes; each report costs O(1) regardless of history length.
+        if self.origin is None:
+            self.origin = timestamp
+        t = (timestamp - self.origin) / SECONDS_PER_YEAR
+
+        self.sum_t += t
+        self.sum_y += score
+        self.sum_tt += t * t
+        self.sum_ty += t * score
+
+        self.ewma = score if self.ewma is None else (
+            self.alpha * score + (1 - self.alpha) * self.ewma
+        )
+
+        if self.last_score is not None:
+            delta = score - self.last_score
+            self.delta_count += 1
+            step = delta - self.delta_mean
+            self.delta_mean += step / self.delta_count
+            self.delta_m2 += step * (delta - self.delta_mean)
+        self.last_score = score
+
+    def append(self, timestamp, biomarkers, risk_result):
+        if self.size == len(self.timestamps):
+            self._grow()
+
+        # Reports normally arrive in time order; a late one is slotted in and
+        # the aggregates are rebuilt once.
+        position = self.size
+        in_order = self.size == 0 or timestamp >= self.timestamps[self.size - 1]
+        if not in_order:
+            position = int(np.searchsorted(self.timestamps[:self.size], timestamp, side="right"))
+            for name in ("timestamps", "scores", "vectors", "biomarkers"):
+                values = getattr(self, name)
+                values[position + 1:self.size + 1] = values[position:self.size]
+
+        score = float(risk_result["risk_score"])
+        self.timestamps[position] = timestamp
+        self.scores[position] = score
+        self.vectors[position] = [risk_result["risk_vector"][name] for name in RISK_DOMAINS]
+        self.biomarkers[position] = [
+            np.nan if biomarkers.get(name) is None else biomarkers[name]
+            for name in BATCH_BIOMARKERS
+        ]
+        self.size += 1
+
+        if in_order:
+            self._accumulate(timestamp, score)
+        else:
+            self._reset_aggregates()
+            for i in range(self.size):
+                self._accumulate(self.timestamps[i], self.scores[i])
+
+    def trend(self):
+        n = self.size
+        denominator = n * self.sum_tt - self.sum_t ** 2
+        slope = None
+        if n >= 2 and denominator > 1e-12:
+            slope = (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+        volatility = None
+        if self.delta_count >= 2:
+            volatility = (self.delta_m2 / (self.delta_count - 1)) ** 0.5
+
+        return {
+            "points": n,
+            "slope_per_year": round(float(slope), 2) if slope is not None else None,
+            "ewma_score": round(float(self.ewma), 1) if self.ewma is not None else None,
+            "volatility": round(float(volatility), 2) if volatility is not None else None
+        }
+
+    def range(self, start=None, end=None, limit=None):
+        times = self.timestamps[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = self.size if end is None else int(np.searchsorted(times, end, side="right"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return slice(lo, hi)
+
+
+class TimeSeriesStore:
+
+    # Per-patient histories, local to the process. Bounded by patient count;
+    # the one that least recently had a report appended is dropped first.
+
+    def __init__(self, alpha=0.3, max_patients=10000):
+        self.alpha = alpha
+        self.max_patients = max_patients
+        self.series = OrderedDict()
+        self.lock = threading.Lock()
+
+    def append(self, patient_id, biomarkers, risk_result, timestamp=None):
+        with self.lock:
+            series = self.series.get(patient_id)
+            if series is None:
+                series = self.series[patient_id] = PatientSeries(alpha=self.alpha)
+            self.series.move_to_end(patient_id)
+            while len(self.series) > self.max_patients:
+                self.series.popitem(last=False)
+            series.append(time.time() if timestamp is None else timestamp, biomarkers, risk_result)
+            return series.trend()
+
+    def trend(self, patient_id):
+        with self.lock:
+            series = self.series.get(patient_id)
+            return series.trend() if series else None
+
+    def history(self, patient_id, start=None, end=None, limit=None):
+        with self.lock:
+            series = self.series.get(patient_id)
+            if series is None:
+                return None
+
+            window = series.range(start, end, limit)
+            biomarkers = series.biomarkers[window]
+            return {
+                "timestamps": series.timestamps[window].tolist(),
+                "risk_scores": series.scores[window].astype(int).tolist(),
+                "risk_vectors": {
+                    name: series.vectors[window, i].tolist()
+                    for i, name in enumerate(RISK_DOMAINS)
+                },
+                "biomarkers": {
+                    name: [None if np.isnan(v) else float(v) for v in biomarkers[:, i]]
+                    for i, name in enumerate(BATCH_BIOMARKERS)
+                }
+            }
+
+
+def trend_trajectory(trend, fallback):
+    slope = trend["slope_per_year"] if trend else None
+    if slope is None:
+        return fallback
+    if slope > TREND_SLOPE_THRESHOLD:
+        return "Accelerating"
+    if slope < -TREND_SLOPE_THRESHOLD:
+        return "Improving"
+    return "Stable"
+
+
+timeseries_store = TimeSeriesStore(alpha=TREND_EWMA_ALPHA, max_patients=TREND_MAX_PATIENTS)
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import UPLOAD_MAX_BYTES, UPLOAD_MAX_REQUEST_BYTES, UPLOAD_CHUNK_BYTES, UPLOAD_DIR
+
+# PDF 1.x/2.0 put "%PDF-" at the start of the file; readers accept it anywhere
+# in the first 1 KB, so that is where we look.
+PDF_MAGIC = b"%PDF-"
+SNIFF_BYTES = 1024
+
+
+class SpooledPdf:
+
+    # An upload copied to a named temp file in fixed-size chunks. The parse
+    # worker opens it by path, so the document is never held in memory by the
+    # API process or pickled across to the worker. The digest is computed
+    # while copying and is the extraction cache key.
+
+    def __init__(self, path, size, digest):
+        self.path = path
+        self.size = size
+        self.digest = digest
+
+    def document(self):
+        # What the parse worker is handed.
+        return self.path
+
+    def close(self):
+        if self.path is None:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class UploadedPdf(SpooledPdf):
+
+    # A multipart upload left where Starlette spooled it. It is sniffed and
+    # hashed in place, so a cache hit never copies it. On a miss, a document
+    # that fits in one chunk goes to the worker as bytes; a larger one is
+    # copied once to a named temp file, because Starlette's rollover file has
+    # no name another process can open.
+
+    def __init__(self, stream, size, digest, chunk_bytes=UPLOAD_CHUNK_BYTES):
+        super().__init__(None, size, digest)
+        self.stream = stream
+        self.chunk_bytes = chunk_bytes
+
+    def document(self):
+        # Blocking; parse_cached calls it through run_in_threadpool.
+        self.stream.seek(0)
+        if self.size <= self.chunk_bytes:
+            return self.stream.read()
+        if self.path is None:
+            handle = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", dir=UPLOAD_DIR, delete=False)
+            try:
+                with handle:
+                    shutil.copyfileobj(self.stream, handle, self.chunk_bytes)
+            except BaseException:
+                os.unlink(handle.name)
+                raise
+            self.path = handle.name
+        return self.path
+
+
+def _pdf_chunks(stream, max_bytes, chunk_bytes):
+    head = stream.read(SNIFF_BYTES)
+    if PDF_MAGIC not in head:
+        raise HTTPException(status_code=415, detail="File is not a PDF")
+
+    size = 0
+    chunk = head
+    while chunk:
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"PDF exceeds {max_bytes} bytes"
+            )
+        yield chunk
+        chunk = stream.read(chunk_bytes)
+
+
+def spool_pdf(stream, max_bytes=UPLOAD_MAX_BYTES, chunk_bytes=UPLOAD_CHUNK_BYTES):
+
+    # Blocking; call through run_in_threadpool from request handlers. For
+    # streams that cannot be reread, such as zip members.
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", dir=UPLOAD_DIR, delete=False)
+
+    try:
+        with handle:
+            for chunk in _pdf_chunks(stream, max_bytes, chunk_bytes):
+                size += len(chunk)
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+
+    return SpooledPdf(handle.name, size, digest.hexdigest())
+
+
+def inspect_pdf(stream, max_bytes=UPLOAD_MAX_BYTES, chunk_bytes=UPLOAD_CHUNK_BYTES):
+
+    # Blocking. Same checks as spool_pdf for a seekable stream, without the
+    # copy; the stream is rewound for the parse.
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in _pdf_chunks(stream, max_bytes, chunk_bytes):
+        size += len(chunk)
+        digest.update(chunk)
+    stream.seek(0)
+
+    return UploadedPdf(stream, size, digest.hexdigest(), chunk_bytes)
+
+
+def check_upload_size(upload, max_bytes=UPLOAD_MAX_BYTES):
+    # Starlette records each part's size while parsing the body, so an
+    # oversized PDF is refused before a byte of it is read back.
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"PDF exceeds {max_bytes} bytes")
+
+
+async def spool_upload(upload, max_bytes=UPLOAD_MAX_BYTES):
+    check_upload_size(upload, max_bytes)
+    return await run_in_threadpool(inspect_pdf, upload.file, max_bytes)
+
+
+async def limit_upload_body(request, call_next):
+    # HTTP middleware: turns away bodies whose declared length is over the cap
+    # before the multipart parser reads a byte of them. Chunked uploads without
+    # a length are still bounded per file by spool_pdf.
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > UPLOAD_MAX_REQUEST_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body exceeds {UPLOAD_MAX_REQUEST_BYTES} bytes"}
+        )
+    return await call_next(request)
@@ -0,0 +1,36 @@
+import time
+
+from app.config import WARMUP
+
+COMPONENTS = ("parsers", "llm")
+
+
+def import_parsers():
+    # Runs inside a parse worker so the first real parse skips the import.
+    import pdfplumber
+    import PyPDF2
+    return True
+
+
+async def warm_up(components=WARMUP):
+    if "all" in components:
+        components = COMPONENTS
+    unknown = set(components) - set(COMPONENTS)
+    if unknown:
+        raise ValueError(f"Unknown warm-up components: {', '.join(sorted(unknown))}")
+
+    timings = {}
+
+    if "parsers" in components:
+        from app.services.parse_executor import parse_executor
+        start = time.perf_counter()
+        await parse_executor.prime(import_parsers)
+        timings["parsers"] = round(time.perf_counter() - start, 3)
+
+    if "llm" in components:
+        from app.services.ai_report_engine import get_async_client
+        start = time.perf_counter()
+        get_async_client()
+        timings["llm"] = round(time.perf_counter() - start, 3)
+
+    return timings
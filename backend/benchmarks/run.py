@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.synthetic_pdf import LAYOUTS, synthetic_report, synthetic_values
+
+BEHAVIORAL = {"sleep_hours": 6, "stress_level": 7, "exercise_days": 2, "alcohol_frequency": 3}
+
+
+def summarize(name, latencies, params=None, extra=None):
+    latencies = np.asarray(latencies) * 1000
+    total = latencies.sum() / 1000
+    return {
+        "name": name,
+        "params": params or {},
+        "iterations": len(latencies),
+        "total_seconds": round(float(total), 4),
+        "throughput_per_second": round(len(latencies) / total, 2) if total else None,
+        "latency_ms": {
+            "min": round(float(latencies.min()), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p90": round(float(np.percentile(latencies, 90)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+            "max": round(float(latencies.max()), 3)
+        },
+        **(extra or {})
+    }
+
+
+def measure(fn, inputs, warmup=1):
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    outputs = []
+    for item in inputs:
+        start = time.perf_counter()
+        outputs.append(fn(item))
+        latencies.append(time.perf_counter() - start)
+    return latencies, outputs
+
+
+def accuracy(outputs, expected, markers):
+    hits = total = 0
+    for found, values in zip(outputs, expected):
+        for name in markers:
+            if name in values:
+                total += 1
+                hits += found.get(name) is not None and abs(found[name] - values[name]) < 1e-9
+    return round(hits / total, 4) if total else None
+
+
+def bench_parsers(args):
+    from app.main import parse_pdf_bytes, REPORT_MARKERS
+    from app.services.pdf_parser import extract_text_from_pdf
+    from app.services.biomarker_extractor import extract_biomarkers_from_pdf, BIOMARKER_TABLE
+
+    results = []
+    for layout in args.layouts:
+        for pages in args.pages:
+            reports = [synthetic_report(pages, layout, seed=i) for i in range(args.iterations)]
+            pdfs = [pdf for pdf, _ in reports]
+            expected = [values for _, values in reports]
+            params = {"layout": layout, "pages": pages, "bytes": int(np.mean([len(p) for p in pdfs]))}
+
+            latencies, _ = measure(extract_text_from_pdf, pdfs)
+            results.append(summarize("pdf_parser.extract_text_from_pdf", latencies, params))
+
+            latencies, outputs = measure(extract_biomarkers_from_pdf, pdfs)
+            results.append(summarize(
+                "biomarker_extractor.extract_biomarkers_from_pdf", latencies, params,
+                {"extraction_accuracy": accuracy(outputs, expected, BIOMARKER_TABLE.markers)}
+            ))
+
+            latencies, outputs = measure(parse_pdf_bytes, pdfs)
+            results.append(summarize(
+                "main.parse_pdf_bytes", latencies, params,
+                {"extraction_accuracy": accuracy(outputs, expected, REPORT_MARKERS.markers)}
+            ))
+    return results
+
+
+def bench_scoring(args):
+    import random
+    from app.main import compute
+    from app.services.risk_engine import calculate_risk_engine, calculate_risk_engine_batch
+
+    rng = random.Random(args.seed)
+    patients = [synthetic_values(rng, missing=0.1) for _ in range(args.scoring_iterations)]
+    results = []
+
+    latencies, _ = measure(lambda b: calculate_risk_engine(b, {}, BEHAVIORAL), patients)
+    results.append(summarize("risk_engine.calculate_risk_engine", latencies))
+
+    latencies, _ = measure(lambda b: compute(b, 7, 6, seed=args.seed), patients)
+    results.append(summarize("main.compute", latencies, {"monte_carlo": True}))
+
+    columns = {
+        name: np.array([p.get(name, np.nan) for p in patients], dtype=float)
+        for name in {key for p in patients for key in p}
+    }
+    latencies, _ = measure(lambda _: calculate_risk_engine_batch(columns), [None] * 20)
+    results.append(summarize(
+        "risk_engine.calculate_risk_engine_batch", latencies,
+        {"rows": len(patients)},
+        {"rows_per_second": round(len(patients) * 20 / sum(latencies), 1)}
+    ))
+    return results
+
+
+def bench_endpoints(args):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Narratives are deferred so the LLM provider's latency is not part of
+    # the measurement.
+    client = TestClient(app)
+    results = []
+
+    def upload(path, params=None):
+        def call(pdf):
+            response = client.post(path, params=params, files={"file": ("report.pdf", pdf, "application/pdf")})
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+            return response
+        return call
+
+    for layout in args.layouts:
+        pages = max(args.pages)
+        # Distinct seeds miss the extraction cache; a repeated report hits it.
+        cold = [synthetic_report(pages, layout, seed=10_000 + i)[0] for i in range(args.iterations)]
+        warm = [cold[0]] * args.iterations
+        params = {"layout": layout, "pages": pages}
+
+        for name, path, query in (
+            ("POST /upload-report", "/upload-report", {"seed": args.seed}),
+            ("POST /report/upload-report", "/report/upload-report", {"defer_narrative": "true", **BEHAVIORAL})
+        ):
+            call = upload(path, query)
+            latencies, _ = measure(call, cold, warmup=0)
+            results.append(summarize(name, latencies, {**params, "cache": "cold"}))
+            latencies, _ = measure(call, warm)
+            results.append(summarize(name, latencies, {**params, "cache": "warm"}))
+
+    # Batches of distinct reports, so every parse misses the cache.
+    batch_size = 10
+    batches = [
+        [synthetic_report(1, args.layouts[0], seed=20_000 + i * batch_size + j)[0] for j in range(batch_size)]
+        for i in range(args.iterations)
+    ]
+
+    def upload_batch(pdfs):
+        files = [("files", (f"report-{i}.pdf", pdf, "application/pdf")) for i, pdf in enumerate(pdfs)]
+        response = client.post("/report/upload-reports", params=BEHAVIORAL, files=files)
+        if response.status_code != 200 or response.text.count("\n") < len(pdfs):
+            raise RuntimeError(f"/report/upload-reports returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    latencies, _ = measure(upload_batch, batches, warmup=0)
+    results.append(summarize("POST /report/upload-reports", latencies, {"reports": batch_size, "cache": "cold"}))
+
+    simulate = lambda _: client.post("/simulate-risk", params={"ldl": 120, "alt": 60, "seed": args.seed})
+    latencies, _ = measure(simulate, [None] * args.iterations)
+    results.append(summarize("POST /simulate-risk", latencies))
+
+    # The /upload-report runs above left a baseline in the default session.
+    axes = {"ldl": {"start": 70, "stop": 190, "step": 10}, "alt": {"start": 20, "stop": 110, "step": 10}}
+    sweep = lambda _: client.post("/simulate-risk/sweep", json={"axes": axes, "seed": args.seed})
+    latencies, _ = measure(sweep, [None] * args.iterations)
+    results.append(summarize("POST /simulate-risk/sweep", latencies, {"points": 13 * 10}))
+
+    client.close()
+    return results
+
+
+SUITES = {
+    "parsers": bench_parsers,
+    "scoring": bench_scoring,
+    "endpoints": bench_endpoints
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    # Regressions are p50 slowdowns beyond `threshold` percent for benchmarks
+    # present in both runs with identical parameters.
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        old, new = before["latency_ms"]["p50"], result["latency_ms"]["p50"]
+        change = (new - old) / old * 100 if old else 0
+        if change > threshold:
+            regressions.append({
+                "name": result["name"],
+                "params": result["params"],
+                "baseline_p50_ms": old,
+                "p50_ms": new,
+                "change_percent": round(change, 1)
+            })
+    return regressions
+
+
+def isolate_stores(directory):
+    # The endpoint suite uploads reports, which appends cohort rows, stores
+    # sessions and fills the extraction cache. Point all of them at a scratch
+    # directory before the app (and so app.config) is first imported.
+    os.environ["COHORT_DATA_DIR"] = os.path.join(directory, "cohort")
+    os.environ["STATE_SQLITE_PATH"] = os.path.join(directory, "state.db")
+    os.environ["UPLOAD_DIR"] = directory
+    if os.environ.get("EXTRACTION_CACHE_PATH"):
+        os.environ["EXTRACTION_CACHE_PATH"] = os.path.join(directory, "extraction_cache.db")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsers, scoring and endpoints on synthetic reports.")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="Suites to run (default: all).")
+    parser.add_argument("--iterations", type=int, default=20, help="Reports per parser/endpoint case.")
+    parser.add_argument("--scoring-iterations", type=int, default=2000, help="Patients per scoring case.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20], help="Page counts to generate.")
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=LAYOUTS)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--output", default=None, help="Results path (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed p50 slowdown in percent.")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="benchmarks-") as scratch:
+        isolate_stores(scratch)
+        for name in args.suite or list(SUITES):
+            print(f"running {name}...", file=sys.stderr)
+            results.extend(SUITES[name](args))
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+        },
+        "results": results
+    }
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            report["regressions"] = compare(report, json.load(handle), args.threshold)
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results",
+        started.strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+
+    for result in results:
+        params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+        latency = result["latency_ms"]
+        print(f"{result['name']:<50} {params:<40} p50={latency['p50']:>9.3f}ms p95={latency['p95']:>9.3f}ms")
+    print(f"results written to {output}", file=sys.stderr)
+
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['name']} {regression['params']}: {regression['change_percent']}%", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
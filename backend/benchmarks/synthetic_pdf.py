@@ -0,0 +1,141 @@
+import random
+
+# Labels as they appear on the lab reports both extractors were written for.
+MARKERS = [
+    ("fasting_glucose", "Glucose, Fasting", "mg/dL", 70, 190),
+    ("hba1c", "HbA1c", "%", 4.6, 9.5),
+    ("ldl", "LDL Cholesterol", "mg/dL", 60, 240),
+    ("hdl", "HDL Cholesterol", "mg/dL", 25, 85),
+    ("triglycerides", "Triglycerides", "mg/dL", 60, 450),
+    ("ast", "AST (SGOT)", "U/L", 12, 260),
+    ("alt", "ALT (SGPT)", "U/L", 10, 380),
+    ("hs_crp", "High Sensitivity CRP", "mg/L", 0.2, 11),
+    ("vitamin_d", "Vitamin D, 25 Hydroxy", "ng/mL", 6, 90),
+    ("esr", "E.S.R.", "mm/hr", 2, 70),
+]
+
+LAYOUTS = ("inline", "stacked", "table")
+
+FILLER = [
+    "Complete Blood Count",
+    "Haemoglobin 13.9 g/dL",
+    "Total Leucocyte Count 7.2 10^3/uL",
+    "Platelet Count 250 10^3/uL",
+    "Serum Creatinine 0.9 mg/dL",
+    "Interpretation: correlate clinically.",
+]
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 842
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x, y, text):
+    return f"BT /F1 10 Tf {x} {y} Td ({_escape(text)}) Tj ET"
+
+
+def _lines_page(lines):
+    ops = []
+    y = PAGE_HEIGHT - 60
+    for line in lines:
+        ops.append(_text(50, y, line))
+        y -= 14
+    return "\n".join(ops)
+
+
+def _table_page(rows):
+    # Ruled grid so pdfplumber's line-based table finder picks up every cell.
+    columns = [50, 260, 360, 450]
+    row_height = 18
+    top = PAGE_HEIGHT - 60
+    bottom = top - row_height * len(rows)
+    ops = ["0.5 w"]
+
+    for i in range(len(rows) + 1):
+        y = top - i * row_height
+        ops.append(f"{columns[0]} {y} m {columns[-1]} {y} l S")
+    for x in columns:
+        ops.append(f"{x} {top} m {x} {bottom} l S")
+
+    for i, row in enumerate(rows):
+        y = top - (i + 1) * row_height + 5
+        for x, cell in zip(columns, row):
+            ops.append(_text(x + 4, y, cell))
+
+    return "\n".join(ops)
+
+
+def build_pdf(page_streams):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+
+    for stream in page_streams:
+        page_id = len(objects) + 1
+        content = stream.encode("latin-1")
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        kids.append(page_id)
+
+    objects[1] = (
+        f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+    ).encode()
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+def synthetic_values(rng, missing=0.0):
+    values = {}
+    for name, _, _, low, high in MARKERS:
+        if rng.random() < missing:
+            continue
+        value = rng.uniform(low, high)
+        values[name] = round(value, 1) if high < 20 else round(value)
+    return values
+
+
+def synthetic_report(pages=2, layout="inline", seed=0, missing=0.0):
+    # Returns (pdf_bytes, values). The marker block lands on the last page so
+    # parsers walk every filler page first; `seed` also tags the header so
+    # otherwise identical reports hash differently.
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+
+    rng = random.Random(seed)
+    values = synthetic_values(rng, missing)
+    header = [f"Synthetic Diagnostics Lab - Sample {seed}", f"Patient ID: SYN-{seed:08d}"]
+
+    streams = [
+        _lines_page(header + [f"Page {index + 1}"] + FILLER * 3)
+        for index in range(max(pages - 1, 0))
+    ]
+
+    found = [
+        (label, str(values[name]), unit)
+        for name, label, unit, _, _ in MARKERS
+        if name in values
+    ]
+    if layout == "table":
+        streams.append(_table_page([("Test", "Result", "Unit")] + found))
+    elif layout == "stacked":
+        streams.append(_lines_page(header + [line for label, value, unit in found for line in (label, f"{value} {unit}")]))
+    else:
+        streams.append(_lines_page(header + [f"{label} {value} {unit}" for label, value, unit in found]))
+
+    return build_pdf(streams), values
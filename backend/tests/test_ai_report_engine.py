@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("groq")
+
+from app.services import ai_report_engine as engine
+
+
+class StubLLM:
+
+    # Local stand-in for the Groq chat completions API.
+
+    def __init__(self):
+        self.delay = 0.0
+        self.status = 200
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    number = stub.requests
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    payload = json.dumps({
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [{
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": f" report {number} "}
+                        }]
+                    } if stub.status == 200 else {"error": {"message": "boom"}}).encode()
+                    self.send_response(stub.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(engine, "GROQ_BASE_URL", stub.url)
+    monkeypatch.setattr(engine, "GROQ_API_KEY", "test")
+    # Module state is per process; each test gets a fresh client, cache and
+    # limiter bound to its own event loop.
+    monkeypatch.setattr(engine, "_clients", {})
+    monkeypatch.setattr(engine, "_report_cache", engine.OrderedDict())
+    monkeypatch.setattr(engine, "_inflight", {})
+    monkeypatch.setattr(engine, "_limiter", asyncio.Semaphore(engine.LLM_MAX_CONCURRENCY))
+    yield stub
+    stub.close()
+
+
+def generate(*calls):
+    async def run():
+        try:
+            return await asyncio.gather(*(
+                engine.generate_ai_clinical_report_async(biomarkers, risk) for biomarkers, risk in calls
+            ))
+        finally:
+            # The pooled client belongs to this event loop.
+            client = engine._clients.pop("async", None)
+            if client is not None:
+                await client.close()
+    return asyncio.run(run())
+
+
+def patient(i):
+    return {"ldl": 100 + i}, {"risk_score": i}
+
+
+def test_report_is_cached_after_first_call(llm):
+    first, second = generate(patient(1)), generate(patient(1))
+    assert first == second == ["report 1"]
+    assert llm.requests == 1
+
+
+def test_identical_concurrent_requests_share_one_call(llm):
+    llm.delay = 0.2
+    reports = generate(*[patient(1)] * 5)
+    assert reports == ["report 1"] * 5
+    assert llm.requests == 1
+
+
+def test_concurrency_is_capped_by_the_limiter(llm, monkeypatch):
+    monkeypatch.setattr(engine, "_limiter", asyncio.Semaphore(2))
+    llm.delay = 0.1
+    reports = generate(*[patient(i) for i in range(6)])
+    assert len(set(reports)) == 6
+    assert llm.max_active == 2
+
+
+def test_slow_provider_times_out_to_fallback(llm, monkeypatch):
+    monkeypatch.setattr(engine, "LLM_TIMEOUT_SECONDS", 0.2)
+    llm.delay = 1.0
+    start = time.perf_counter()
+    assert generate(patient(1)) == [engine.FALLBACK_REPORT]
+    assert time.perf_counter() - start < 1.0
+    assert not engine._report_cache
+
+
+def test_provider_error_falls_back_and_is_not_cached(llm):
+    llm.status = 400
+    assert generate(patient(1)) == [engine.FALLBACK_REPORT]
+    llm.status = 200
+    assert generate(patient(1)) == [f"report {llm.requests}"]
+
+
+def test_cache_evicts_least_recently_used(llm, monkeypatch):
+    monkeypatch.setattr(engine, "LLM_CACHE_SIZE", 2)
+    generate(patient(1))
+    generate(patient(2))
+    generate(patient(1))
+    generate(patient(3))
+    assert llm.requests == 3
+    generate(patient(2))
+    assert llm.requests == 4
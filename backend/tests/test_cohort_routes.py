@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import cohort_routes
+from app.services.cohort_store import CohortStore
+from app.services.risk_engine import calculate_risk_engine
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = CohortStore(str(tmp_path / "cohort"))
+    monkeypatch.setattr(cohort_routes, "cohort_store", store)
+    return store
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def risk(ldl, alt):
+    return calculate_risk_engine({"ldl": ldl, "alt": alt, "hdl": 50}, {}, None)
+
+
+def test_cohort_routes_are_mounted(client, store):
+    store.append([risk(100, 20), risk(220, 300)], ["acme", "acme"], ["F", "m"], [35, 62])
+    store.append([risk(150, 60)], ["globex"], [None], [None])
+
+    response = client.get("/cohort/distribution", params={"group_by": "employer"})
+    assert response.status_code == 200
+    groups = response.json()["groups"]
+    assert sum(groups["acme"]) == 2
+    assert sum(groups["globex"]) == 1
+
+    response = client.get("/cohort/percentiles", params={"group_by": "age_band"})
+    assert response.status_code == 200
+    assert response.json()["groups"]["unknown"]["members"] == 1
+
+    response = client.get("/cohort/risk-levels", params={"employer_id": "acme"})
+    assert response.status_code == 200
+    assert response.json()["groups"]["all"]["members"] == 2
+
+    response = client.get("/cohort/domain-priorities", params={"group_by": "gender"})
+    assert response.status_code == 200
+    assert set(response.json()["groups"]) == {"f", "m", "unknown"}
+
+
+def test_cohort_rejects_unknown_grouping(client, store):
+    response = client.get("/cohort/distribution", params={"group_by": "zip"})
+    assert response.status_code == 400
+
+
+def test_rows_from_a_crashed_append_are_dropped(tmp_path):
+    directory = str(tmp_path / "cohort")
+    store = CohortStore(directory)
+    store.append([risk(100, 20), risk(220, 300)], ["acme", "acme"])
+
+    # A writer that died after writing some of the columns of the next row.
+    for name in ("timestamp", "risk_score", "risk_level"):
+        with open(store._path(name), "ab") as handle:
+            handle.write(b"\x01" * store._row_bytes(name))
+    assert store.rows() == 2
+
+    reopened = CohortStore(directory)
+    assert all(
+        (tmp_path / "cohort" / f"{name}.bin").stat().st_size == 2 * reopened._row_bytes(name)
+        for name in ("timestamp", "risk_score", "risk_level", "age")
+    )
+    store.append([risk(150, 60)], ["globex"])
+    scores = reopened.column("risk_score").tolist()
+    assert scores == [risk(100, 20)["risk_score"], risk(220, 300)["risk_score"], risk(150, 60)["risk_score"]]
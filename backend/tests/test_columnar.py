@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.scoring_app import app
+
+ARROW = "application/vnd.apache.arrow.stream"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_non_numeric_csv_cell_is_rejected_before_streaming(client):
+    response = client.post(
+        "/score/columnar",
+        content=b"patient_id,ldl\np1,120\np2,abc\n",
+        headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 400
+    assert "abc" in response.json()["detail"]
+
+
+def test_empty_csv_returns_header(client):
+    response = client.post("/score/columnar", content=b"ldl,hdl\n", headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    assert response.text.startswith("risk_score,risk_level")
+
+
+def arrow_body(pa, table):
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_stream(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def test_non_numeric_arrow_column_is_rejected(client):
+    pa = pytest.importorskip("pyarrow")
+    response = client.post(
+        "/score/columnar",
+        content=arrow_body(pa, pa.table({"ldl": ["120", "x"]})),
+        headers={"content-type": ARROW}
+    )
+    assert response.status_code == 400
+
+
+def test_empty_arrow_input_returns_schema(client):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    response = client.post(
+        "/score/columnar",
+        content=arrow_body(pa, pa.table({"ldl": pa.array([], pa.float64())})),
+        headers={"content-type": ARROW}
+    )
+    assert response.status_code == 200
+    table = pyarrow.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 0
+    assert "risk_score" in table.schema.names
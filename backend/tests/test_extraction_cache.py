@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import parse_executor as module
+from app.services.extraction_cache import ExtractionCache, pdf_digest
+
+DOCUMENT = b"%PDF-1.7\n report"
+
+
+def extract(document):
+    return {"ldl": 150.0}
+
+
+class RecordingConnection:
+
+    def __init__(self, db, threads):
+        self.db = db
+        self.threads = threads
+
+    def execute(self, *args):
+        self.threads.add(threading.get_ident())
+        return self.db.execute(*args)
+
+    def commit(self):
+        self.threads.add(threading.get_ident())
+        self.db.commit()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(max_entries=8, disk_path=str(tmp_path / "cache.db"))
+    monkeypatch.setattr(module, "extraction_cache", cache)
+    return cache
+
+
+def test_disk_tier_runs_off_the_event_loop(cache):
+    threads = set()
+    cache.db = RecordingConnection(cache.db, threads)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        first = await module.parse_cached(DOCUMENT, "test", "1", extract)
+        cache.memory.clear()
+        second = await module.parse_cached(DOCUMENT, "test", "1", extract)
+        third = await module.parse_cached(DOCUMENT, "test", "1", extract)
+        return loop_thread, [first, second, third]
+
+    loop_thread, results = asyncio.run(main())
+    assert results == [{"ldl": 150.0}] * 3
+    assert threads and loop_thread not in threads
+    assert (cache.misses, cache.disk_hits, cache.hits) == (1, 1, 1)
+
+
+def test_stale_version_misses_both_tiers(cache):
+    digest = pdf_digest(DOCUMENT)
+    cache.put_memory(digest, "test", "1", {"ldl": 150.0})
+    cache.put_disk(digest, "test", "1", {"ldl": 150.0})
+    assert cache.get_memory(digest, "test", "2") is None
+    assert cache.get_disk(digest, "test", "2") is None
+    assert cache.get_disk(digest, "test", "1") == {"ldl": 150.0}
@@ -0,0 +1,40 @@
+import re
+
+from app.main import REPORT_MARKERS
+from app.services.biomarker_extractor import BIOMARKER_TABLE
+
+
+def per_marker(table, text, follow):
+    # The extraction the single scan replaced: one re.search per marker.
+    found = {}
+    for name, label in table.markers.items():
+        match = re.search(label + follow, text, re.IGNORECASE)
+        found[name] = float(match.group(1)) if match else None
+    return found
+
+
+def test_several_markers_on_one_line():
+    text = "Vitamin B12 410 HDL 45 LDL 130 Triglycerides 180\nVitamin D 22 ALT 35 AST 30"
+    found = BIOMARKER_TABLE.scan(text)
+    assert found["hdl"] == 45
+    assert found["ldl"] == 130
+    assert found["triglycerides"] == 180
+    assert found["alt"] == 35
+    assert found["ast"] == 30
+    assert found == per_marker(BIOMARKER_TABLE, text, r".*?(\d+\.?\d*)")
+
+
+def test_label_inside_another_label_is_still_seen():
+    text = "Fasting glucose 92 HbA1c 5.6 hs CRP 1.2"
+    found = BIOMARKER_TABLE.scan(text)
+    assert found == per_marker(BIOMARKER_TABLE, text, r".*?(\d+\.?\d*)")
+    assert found["ast"] == 92
+
+
+def test_report_markers_take_the_value_from_the_next_line():
+    text = "LDL Cholesterol HDL Cholesterol\n130 45\nVitamin D, 25 Hydroxy 31"
+    found = REPORT_MARKERS.scan(text)
+    assert found == per_marker(REPORT_MARKERS, text, r"[^\n]*?\n?.*?([\d]+\.?[\d]*)")
+    assert found["ldl"] == 130
+    assert found["hdl"] == 130
+    assert found["vitamin_d"] == 31
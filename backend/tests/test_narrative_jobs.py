@@ -0,0 +1,23 @@
+import asyncio
+
+from app.services import narrative_jobs as module
+from app.services.narrative_jobs import NarrativeJobs
+
+
+def test_full_queue_rejects_instead_of_growing(monkeypatch):
+    async def narrative(biomarkers, risk_result):
+        await asyncio.sleep(0.05)
+        return "report"
+
+    monkeypatch.setattr(module, "generate_ai_clinical_report_async", narrative)
+    jobs = NarrativeJobs(workers=1, queue_depth=2)
+
+    async def main():
+        accepted = [jobs.submit({}, {}) for _ in range(4)]
+        finished = [await jobs.wait(job_id, timeout=5) for job_id in accepted if job_id]
+        return accepted, finished
+
+    accepted, finished = asyncio.run(main())
+    assert [job_id is not None for job_id in accepted] == [True, True, False, False]
+    assert [job["status"] for job in finished] == ["completed", "completed"]
+    assert jobs.stats()["rejected"] == 2
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.parse_executor import ParseExecutor
+
+
+def parse(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def crash(_):
+    os._exit(1)
+
+
+def outcome(executor, fn, arg):
+    async def call():
+        try:
+            return await executor.run(fn, arg)
+        except HTTPException as exc:
+            return exc.status_code
+    return call()
+
+
+def run_all(executor, *jobs):
+    async def main():
+        results = await asyncio.gather(*(outcome(executor, fn, arg) for fn, arg in jobs))
+        # Let replaced workers hand their slots back before asserting.
+        for _ in range(100):
+            if executor.pending == 0:
+                break
+            await asyncio.sleep(0.05)
+        return results
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def executor():
+    executor = ParseExecutor(workers=2, max_pending=32, timeout=1.0)
+    yield executor
+    executor.shutdown()
+
+
+def test_time_queued_does_not_count_against_the_timeout(executor):
+    results = run_all(executor, *[(parse, 0.4)] * 8)
+    assert results == [0.4] * 8
+    assert executor.timeouts == 0
+    assert executor.replaced == 0
+    assert executor.pending == 0
+
+
+def test_stuck_parse_replaces_only_its_worker(executor):
+    results = run_all(executor, (parse, 5), (parse, 0.3), (parse, 0.3), (parse, 0.3))
+    assert results == [504, 0.3, 0.3, 0.3]
+    assert executor.replaced == 1
+    assert executor.pending == 0
+    assert run_all(executor, (parse, 0.1), (parse, 0.1)) == [0.1, 0.1]
+
+
+def test_crashed_worker_fails_only_its_parse(executor):
+    results = run_all(executor, (crash, None), (parse, 0.5))
+    assert results == [503, 0.5]
+    assert executor.replaced == 1
+    assert run_all(executor, (parse, 0.1)) == [0.1]
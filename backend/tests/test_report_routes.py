@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.risk_engine import calculate_risk_engine
+from app.services.timeseries_store import timeseries_store
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_corrupt_zip_is_a_bad_request(client):
+    response = client.post(
+        "/report/upload-reports",
+        files=[("files", ("reports.zip", b"PK\x03\x04 truncated", "application/zip"))]
+    )
+    assert response.status_code == 400
+    assert "reports.zip" in response.json()["detail"]
+
+
+def test_report_jobs_are_mounted(client):
+    assert client.get("/report/report-jobs/missing").status_code == 404
+    assert client.get("/report/report-jobs/missing/events").status_code == 404
+
+
+def test_patient_history_is_mounted(client):
+    timeseries_store.append("history-test", {"ldl": 150}, calculate_risk_engine({"ldl": 150}, {}, None), 1.0)
+    response = client.get("/report/patients/history-test/history")
+    assert response.status_code == 200
+    assert response.json()["timestamps"] == [1.0]
+
+
+def test_intervention_search_is_mounted(client):
+    response = client.post("/report/intervention-search", json={
+        "biomarkers": {"ldl": 190, "hdl": 35, "triglycerides": 260, "alt": 70},
+        "target_level": "Moderate Risk"
+    })
+    assert response.status_code == 200
+    assert response.json()["target_risk_score"] == 60
+
+
+def test_population_simulation_is_mounted(client):
+    response = client.post("/report/simulate-population", json={
+        "patients": [{"ldl": 150, "hdl": 45}],
+        "paths": 50,
+        "seed": 1
+    })
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("overrides", [
+    {"costs": {"ldl": 0}},
+    {"costs": {"ldl": -5}},
+    {"min_compliance": 1.5},
+    {"min_compliance": -0.1},
+])
+def test_intervention_search_rejects_invalid_costs_and_compliance(client, overrides):
+    response = client.post("/report/intervention-search", json={
+        "biomarkers": {"ldl": 190, "hdl": 35},
+        **overrides
+    })
+    assert response.status_code == 422
@@ -0,0 +1,48 @@
+import json
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import RISK_MODEL_DIR
+from app.main import app
+from app.services import risk_model
+
+
+@pytest.fixture
+def models(tmp_path):
+    for path in ("synergy-v1.json", "preventive-v1.json"):
+        shutil.copy(f"{RISK_MODEL_DIR}/{path}", tmp_path / path)
+    yield tmp_path
+    risk_model.load_models()
+    risk_model.activate_model("synergy-v1")
+
+
+def add_variant(directory, version, change):
+    with open(directory / "synergy-v1.json") as handle:
+        spec = json.load(handle)
+    spec.update(version=version, default=False)
+    change(spec)
+    with open(directory / f"{version}.json", "w") as handle:
+        json.dump(spec, handle)
+
+
+def test_variant_with_same_schema_can_be_activated(models):
+    add_variant(models, "synergy-v2", lambda spec: spec["sigmoid"].update(center=0.5))
+    risk_model.load_models(str(models))
+    assert risk_model.activate_model("synergy-v2").version == "synergy-v2"
+
+
+def test_variant_that_changes_markers_is_refused(models):
+    add_variant(models, "synergy-v3", lambda spec: spec["markers"].update(apob=spec["markers"]["ldl"]))
+    with pytest.raises(ValueError, match="synergy-v3"):
+        risk_model.load_models(str(models))
+    with pytest.raises(ValueError):
+        risk_model.get_model("synergy-v3")
+
+
+def test_model_routes_are_mounted_in_main_app():
+    with TestClient(app) as client:
+        response = client.get("/risk-models")
+    assert response.status_code == 200
+    assert response.json()["active"]["synergy"] == "synergy-v1"
@@ -0,0 +1,41 @@
+import time
+
+from app.services.state_store import SQLiteStateStore
+
+
+def store(tmp_path, **limits):
+    return SQLiteStateStore(str(tmp_path / "state.db"), **limits)
+
+
+def test_sqlite_store_caps_sessions_at_prune(tmp_path):
+    state = store(tmp_path, max_sessions=3, prune_interval=3600)
+    for i in range(5):
+        state.set_baseline(f"s{i}", {"ldl": 100 + i}, {"risk_score": i})
+    # Pruning is periodic, so the first write pruned and the rest did not.
+    assert state.stats()["sessions"] == 5
+
+    state.next_prune = 0
+    state.append_history("s4", 10)
+    assert state.stats()["sessions"] == 3
+    assert state.get_baseline("s0") == (None, None)
+    assert state.get_baseline("s4") == ({"ldl": 104}, {"risk_score": 4})
+    assert state.history("s4") == [10]
+
+
+def test_sqlite_store_caps_bytes_like_memory_store(tmp_path):
+    state = store(tmp_path, max_bytes=2000, prune_interval=0)
+    for i in range(20):
+        state.set_baseline(f"s{i}", {"ldl": 100, "note": "x" * 200}, {"risk_score": i})
+    stats = state.stats()
+    assert stats["approx_bytes"] <= 2000
+    assert stats["evictions"] > 0
+    assert state.get_baseline("s19")[1] == {"risk_score": 19}
+    assert state.get_baseline("s0") == (None, None)
+
+
+def test_sqlite_store_drops_expired_sessions(tmp_path):
+    state = store(tmp_path, ttl=0.05, prune_interval=0)
+    state.set_baseline("old", {"ldl": 100}, {"risk_score": 1})
+    time.sleep(0.1)
+    state.set_baseline("new", {"ldl": 100}, {"risk_score": 2})
+    assert state.stats()["sessions"] == 1
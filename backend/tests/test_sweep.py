@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.state_store import state_store
+
+
+@pytest.fixture
+def client():
+    state_store.set_baseline("sweep-test", {"ldl": 160, "alt": 60, "hdl": 45}, {"risk_score": 50})
+    with TestClient(app) as client:
+        yield client
+
+
+def sweep(client, axes):
+    return client.post("/simulate-risk/sweep", json={"session_id": "sweep-test", "axes": axes, "seed": 1})
+
+
+def test_sweep_grid(client):
+    response = sweep(client, {"ldl": {"start": 100, "stop": 160, "step": 20}, "alt": [30, 60]})
+    assert response.status_code == 200
+    assert response.json()["shape"] == [4, 2]
+
+
+@pytest.mark.parametrize("axes", [
+    {"ldl": {"start": 0, "stop": 1e12, "step": 1e-3}},
+    {"ldl": {"start": 0, "stop": 999, "step": 1}, "alt": {"start": 0, "stop": 999, "step": 1}},
+    {"ldl": {"start": 0, "stop": 100, "step": 0}},
+    {"ldl": {"start": 100, "stop": 0, "step": 1}},
+])
+def test_oversized_or_empty_sweep_is_rejected_before_allocating(client, axes):
+    assert sweep(client, axes).status_code == 400
+
+
+def test_negative_seed_is_a_validation_error(client):
+    response = client.post("/simulate-risk/sweep", json={"session_id": "sweep-test", "axes": {"ldl": [100]}, "seed": -1})
+    assert response.status_code == 422
+    assert client.post("/simulate-risk", params={"session_id": "sweep-test", "ldl": 120, "seed": -1}).status_code == 422
+    response = client.post("/report/simulate-population", json={"patients": [{"ldl": 150}], "paths": 10, "seed": -1})
+    assert response.status_code == 422
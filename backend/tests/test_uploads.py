@@ -0,0 +1,55 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from app.services.extraction_cache import pdf_digest
+from app.services.uploads import inspect_pdf, spool_pdf, spool_upload
+
+DOCUMENT = b"%PDF-1.7\n" + bytes(range(256)) * 40
+
+
+class Unreadable(io.BytesIO):
+
+    def read(self, *args):
+        raise AssertionError("upload was read")
+
+
+def test_oversized_upload_is_refused_before_reading():
+    upload = UploadFile(Unreadable(), size=2048, filename="report.pdf")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(spool_upload(upload, max_bytes=1024))
+    assert exc.value.status_code == 413
+
+
+def test_non_pdf_is_refused():
+    with pytest.raises(HTTPException) as exc:
+        inspect_pdf(io.BytesIO(b"PK\x03\x04 not a pdf"))
+    assert exc.value.status_code == 415
+
+
+def test_small_upload_goes_to_the_worker_as_bytes():
+    stream = io.BytesIO(DOCUMENT)
+    with inspect_pdf(stream, chunk_bytes=len(DOCUMENT)) as upload:
+        assert upload.digest == pdf_digest(DOCUMENT)
+        assert upload.size == len(DOCUMENT)
+        assert upload.document() == DOCUMENT
+        assert upload.path is None
+
+
+def test_large_upload_is_copied_once_and_removed():
+    stream = io.BytesIO(DOCUMENT)
+    with inspect_pdf(stream, chunk_bytes=1000) as upload:
+        path = upload.document()
+        assert upload.document() == path
+        with open(path, "rb") as handle:
+            assert handle.read() == DOCUMENT
+    assert not os.path.exists(path)
+
+
+def test_inspected_and_spooled_digests_match():
+    with spool_pdf(io.BytesIO(DOCUMENT), chunk_bytes=1000) as spooled:
+        assert inspect_pdf(io.BytesIO(DOCUMENT), chunk_bytes=1000).digest == spooled.digest